@@ -1,61 +1,118 @@
+from functools import lru_cache
+
+import streamlit as st
 from sqlalchemy import text
 
-from db.session import Base, engine
+from db.session import SQLITE_OPTIMIZE_PRAGMAS, Base, engine
 
 # Import models exactly once so SQLAlchemy mappings are registered on Base.metadata.
 # NOTE: Do not reload this module; reloading remaps classes and duplicates tables.
 import models.entities  # noqa: F401
 
 
-def _column_exists(connection, table: str, column: str) -> bool:
-    result = connection.execute(text(f"PRAGMA table_info({table})"))
-    return any(row[1] == column for row in result.fetchall())
+# Bump whenever create_all() or the migrations below change the schema; SQLite databases stamped
+# with this PRAGMA user_version skip create_all() and the migration pass entirely.
+SCHEMA_VERSION = 3
+
+# create_all() only builds indexes for tables it creates, so existing databases pick them up here.
+INDEX_MIGRATIONS = (
+    "CREATE INDEX IF NOT EXISTS ix_documents_project_created ON documents (project_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_documents_project_doctype_created ON documents (project_id, doc_type, created_at)",
+    "DROP INDEX IF EXISTS ix_documents_project_doctype",
+    "CREATE INDEX IF NOT EXISTS ix_documents_project_doctype_version ON documents (project_id, doc_type, version)",
+    "CREATE INDEX IF NOT EXISTS ix_templates_created ON templates (created_at)",
+)
+
+
+# One introspection pass per database per process; migrations clear it after changing the schema.
+@lru_cache(maxsize=1)
+def _load_schema_snapshot(database_url: str) -> dict[str, frozenset[str]]:
+    with engine.connect() as connection:
+        tables = connection.execute(text("SELECT name FROM sqlite_master WHERE type='table'")).scalars().all()
+        return {
+            table: frozenset(row[1] for row in connection.execute(text(f'PRAGMA table_info("{table}")')))
+            for table in tables
+        }
 
 
-def _table_exists(connection, table: str) -> bool:
-    result = connection.execute(
-        text("SELECT name FROM sqlite_master WHERE type='table' AND name=:table"),
-        {"table": table},
-    )
-    return result.first() is not None
+# Explicit BEGIN/COMMIT: sqlite3's executescript() runs outside the driver's implicit transactions.
+DEAL_PROFILES_DDL = """
+BEGIN;
+CREATE TABLE IF NOT EXISTS deal_profiles (
+    id INTEGER PRIMARY KEY,
+    project_id INTEGER NOT NULL,
+    template_id INTEGER,
+    schema_id VARCHAR(100) NOT NULL,
+    inputs_raw_json TEXT NOT NULL,
+    inputs_normalized_json TEXT NOT NULL,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL,
+    FOREIGN KEY(project_id) REFERENCES prospectus_projects(id),
+    FOREIGN KEY(template_id) REFERENCES templates(id)
+);
+CREATE INDEX IF NOT EXISTS ix_deal_profiles_id ON deal_profiles (id);
+CREATE INDEX IF NOT EXISTS ix_deal_profiles_project_id ON deal_profiles (project_id);
+CREATE INDEX IF NOT EXISTS ix_deal_profiles_template_id ON deal_profiles (template_id);
+CREATE INDEX IF NOT EXISTS ix_deal_profiles_schema_id ON deal_profiles (schema_id);
+COMMIT;
+"""
 
 
 def _create_deal_profiles_table(connection) -> None:
-    connection.execute(
-        text(
-            """
-            CREATE TABLE IF NOT EXISTS deal_profiles (
-                id INTEGER PRIMARY KEY,
-                project_id INTEGER NOT NULL,
-                template_id INTEGER,
-                schema_id VARCHAR(100) NOT NULL,
-                inputs_raw_json TEXT NOT NULL,
-                inputs_normalized_json TEXT NOT NULL,
-                created_at DATETIME NOT NULL,
-                updated_at DATETIME NOT NULL,
-                FOREIGN KEY(project_id) REFERENCES prospectus_projects(id),
-                FOREIGN KEY(template_id) REFERENCES templates(id)
-            )
-            """
-        )
-    )
-    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_deal_profiles_id ON deal_profiles (id)"))
-    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_deal_profiles_project_id ON deal_profiles (project_id)"))
-    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_deal_profiles_template_id ON deal_profiles (template_id)"))
-    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_deal_profiles_schema_id ON deal_profiles (schema_id)"))
+    connection.connection.driver_connection.executescript(DEAL_PROFILES_DDL)
 
 
 def _apply_lightweight_migrations() -> None:
+    schema = _load_schema_snapshot(engine.url.render_as_string(hide_password=False))
+    migrated = False
     with engine.begin() as connection:
-        if _table_exists(connection, "templates") and not _column_exists(connection, "templates", "metadata_json"):
+        if "templates" in schema and "metadata_json" not in schema["templates"]:
             connection.execute(text("ALTER TABLE templates ADD COLUMN metadata_json TEXT"))
-        if not _table_exists(connection, "deal_profiles"):
+            migrated = True
+        if "deal_profiles" not in schema:
             _create_deal_profiles_table(connection)
+            migrated = True
+        for statement in INDEX_MIGRATIONS:
+            connection.execute(text(statement))
+    if migrated:
+        _load_schema_snapshot.cache_clear()
+
+
+def _optimize() -> None:
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as connection:
+        for pragma in SQLITE_OPTIMIZE_PRAGMAS:
+            connection.execute(text(pragma))
+
+
+def _schema_is_current() -> bool:
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.connect() as connection:
+        return connection.execute(text("PRAGMA user_version")).scalar() >= SCHEMA_VERSION
+
+
+def _stamp_schema_version() -> None:
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as connection:
+        connection.execute(text(f"PRAGMA user_version = {SCHEMA_VERSION}"))
 
 
 def init_db() -> None:
-    Base.metadata.create_all(bind=engine)
-    _apply_lightweight_migrations()
+    if not _schema_is_current():
+        Base.metadata.create_all(bind=engine)
+        _apply_lightweight_migrations()
+        _stamp_schema_version()
+    _optimize()
+
+
+# Pages call this on every rerun; cache_resource makes the schema check run once per process.
+@st.cache_resource(show_spinner=False)
+def ensure_db_initialized() -> bool:
+    init_db()
+    return True
 
 
 if __name__ == "__main__":
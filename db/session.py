@@ -1,21 +1,79 @@
 import os
+import sqlite3
+from contextlib import contextmanager
 
+import streamlit as st
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///pa.db")
 
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-engine = create_engine(DATABASE_URL, future=True, connect_args=connect_args)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
+)
+
+# SQLite < 3.46 does not cap the work PRAGMA optimize may do, so set the limit explicitly.
+SQLITE_OPTIMIZE_PRAGMAS = (
+    ("PRAGMA analysis_limit=400", "PRAGMA optimize")
+    if sqlite3.sqlite_version_info < (3, 46, 0)
+    else ("PRAGMA optimize",)
+)
+
+
+def _run_pragmas(dbapi_connection, pragmas: tuple[str, ...]) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in pragmas:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+def _set_sqlite_pragmas(dbapi_connection, _connection_record) -> None:
+    _run_pragmas(dbapi_connection, SQLITE_PRAGMAS)
+
+
+def _optimize_sqlite(dbapi_connection, _connection_record) -> None:
+    # Best effort: a busy or broken connection must still be allowed to close.
+    try:
+        _run_pragmas(dbapi_connection, SQLITE_OPTIMIZE_PRAGMAS)
+    except sqlite3.Error:
+        pass
+
+
+# Keyed by URL so module reloads (Streamlit hot reload, tests) reuse one engine and pool per database.
+@st.cache_resource(show_spinner=False)
+def get_engine(database_url: str = DATABASE_URL) -> Engine:
+    is_sqlite = database_url.startswith("sqlite")
+    connect_args = {"check_same_thread": False} if is_sqlite else {}
+    db_engine = create_engine(database_url, future=True, connect_args=connect_args)
+    if is_sqlite:
+        event.listen(db_engine, "connect", _set_sqlite_pragmas)
+        event.listen(db_engine, "close", _optimize_sqlite)
+    return db_engine
+
+
+@st.cache_resource(show_spinner=False)
+def get_sessionmaker(database_url: str = DATABASE_URL) -> sessionmaker:
+    return sessionmaker(bind=get_engine(database_url), autoflush=False, autocommit=False, future=True)
+
+
+engine = get_engine(DATABASE_URL)
+SessionLocal = get_sessionmaker(DATABASE_URL)
 Base = declarative_base()
 
 
+@contextmanager
 def get_db_session():
-    session = SessionLocal()
+    session = get_sessionmaker(DATABASE_URL)()
     try:
         yield session
     finally:
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from db.session import Base
@@ -17,6 +17,7 @@ class User(Base):
 
 class Template(Base):
     __tablename__ = "templates"
+    __table_args__ = (Index("ix_templates_created", "created_at"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -41,6 +42,11 @@ class ProspectusProject(Base):
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        Index("ix_documents_project_created", "project_id", "created_at"),
+        Index("ix_documents_project_doctype_created", "project_id", "doc_type", "created_at"),
+        Index("ix_documents_project_doctype_version", "project_id", "doc_type", "version"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     project_id: Mapped[int] = mapped_column(ForeignKey("prospectus_projects.id"), nullable=False)
@@ -1,27 +1,32 @@
 from pathlib import Path
 
 import streamlit as st
+from sqlalchemy import func, insert, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
-from db.init_db import init_db
+from db.init_db import ensure_db_initialized
 from db.session import SessionLocal
 from models import Document, ProspectusProject
 from services.document_service import normalize_document_type
+from services.file_cache import file_bytes_loader
 from services.file_service import save_uploaded_file
+from services.queries import (
+    documents_table,
+    invalidate_documents,
+    list_documents,
+    list_projects,
+)
 
-init_db()
+ensure_db_initialized()
 
 st.title("YOUR PROSPECTUS")
 st.caption("Upload, version, preview, and lock project documents.")
 
-session = SessionLocal()
-try:
-    projects = session.query(ProspectusProject).order_by(ProspectusProject.created_at.desc()).all()
-finally:
-    session.close()
+projects = list_projects()
 
 project_options = {"Create new project": None}
 for project in projects:
-    project_options[f"{project.name} (ID {project.id})"] = project.id
+    project_options[f"{project['name']} (ID {project['id']})"] = project["id"]
 
 selected_project_label = st.selectbox("Project", options=list(project_options.keys()))
 selected_project_id = project_options[selected_project_label]
@@ -35,27 +40,25 @@ if selected_project_id is None:
         if not project_name.strip():
             st.error("Project name is required.")
         else:
-            session = SessionLocal()
-            try:
-                existing = session.query(ProspectusProject).filter_by(name=project_name.strip()).first()
-                if existing:
+            with SessionLocal() as session:
+                # The unique index on name decides existence; no row comes back when it already exists.
+                created = session.execute(
+                    sqlite_insert(ProspectusProject)
+                    .values(name=project_name.strip())
+                    .on_conflict_do_nothing(index_elements=["name"])
+                    .returning(ProspectusProject.id)
+                ).first()
+                session.commit()
+                if created is None:
                     st.warning("Project already exists. Select it from the dropdown.")
                 else:
-                    new_project = ProspectusProject(name=project_name.strip())
-                    session.add(new_project)
-                    session.commit()
+                    list_projects.clear()
                     st.success("Project created. Reload or reselect to continue.")
-            finally:
-                session.close()
 else:
-    session = SessionLocal()
-    try:
-        current_project = session.get(ProspectusProject, selected_project_id)
-    finally:
-        session.close()
+    current_project = next(p for p in projects if p["id"] == selected_project_id)
 
-    st.subheader(f"Project: {current_project.name}")
-    st.write(f"Final locked status: **{current_project.locked_final}**")
+    st.subheader(f"Project: {current_project['name']}")
+    st.write(f"Final locked status: **{current_project['locked_final']}**")
 
     with st.form("upload_project_document_form"):
         uploaded_doc = st.file_uploader("Upload PDF/DOCX", type=["pdf", "docx"])
@@ -65,44 +68,34 @@ else:
         if uploaded_doc is None:
             st.error("Please choose a PDF or DOCX file.")
         else:
-            session = SessionLocal()
-            try:
+            with SessionLocal() as session:
                 normalized_doc_type = normalize_document_type(uploaded_doc.name)
-                existing_versions = (
-                    session.query(Document)
+                latest_version = (
+                    session.query(func.coalesce(func.max(Document.version), 0))
                     .filter(Document.project_id == selected_project_id, Document.doc_type == normalized_doc_type)
-                    .count()
+                    .scalar()
                 )
-                next_version = existing_versions + 1
+                next_version = latest_version + 1
                 destination_dir = f"storage/projects/{selected_project_id}"
                 destination_name = f"v{next_version}_{uploaded_doc.name}"
                 file_path, file_sha256 = save_uploaded_file(uploaded_doc, destination_dir, destination_name)
 
-                doc = Document(
-                    project_id=selected_project_id,
-                    doc_type=normalized_doc_type,
-                    file_name=uploaded_doc.name,
-                    file_path=str(file_path),
-                    sha256=file_sha256,
-                    version=next_version,
-                    is_locked=False,
+                session.execute(
+                    insert(Document).values(
+                        project_id=selected_project_id,
+                        doc_type=normalized_doc_type,
+                        file_name=uploaded_doc.name,
+                        file_path=str(file_path),
+                        sha256=file_sha256,
+                        version=next_version,
+                        is_locked=False,
+                    )
                 )
-                session.add(doc)
                 session.commit()
+                invalidate_documents()
                 st.success("Document uploaded and versioned.")
-            finally:
-                session.close()
-
-    session = SessionLocal()
-    try:
-        documents = (
-            session.query(Document)
-            .filter(Document.project_id == selected_project_id)
-            .order_by(Document.created_at.desc())
-            .all()
-        )
-    finally:
-        session.close()
+
+    documents = list_documents(selected_project_id)
 
     st.divider()
     st.subheader("Project Documents")
@@ -110,45 +103,34 @@ else:
     if not documents:
         st.info("No documents uploaded yet.")
     else:
-        table_data = [
-            {
-                "ID": d.id,
-                "Type": d.doc_type,
-                "Version": d.version,
-                "File": d.file_name,
-                "SHA256": d.sha256,
-                "Locked": d.is_locked,
-                "Created At": d.created_at,
-            }
-            for d in documents
-        ]
-        st.dataframe(table_data, use_container_width=True)
+        st.dataframe(documents_table(selected_project_id), use_container_width=True)
 
         st.markdown("#### Downloads")
         for d in documents:
-            document_path = Path(d.file_path)
-            if document_path.exists():
-                with document_path.open("rb") as f:
-                    st.download_button(
-                        label=f"Download Document #{d.id} ({d.doc_type} v{d.version})",
-                        data=f.read(),
-                        file_name=document_path.name,
-                        key=f"document_download_{d.id}",
-                    )
+            # No exists() stat per row: a file deleted behind the DB's back fails the download on click.
+            document_path = Path(d["file_path"])
+            st.download_button(
+                label=f"Download Document #{d['id']} ({d['doc_type']} v{d['version']})",
+                data=file_bytes_loader(document_path, d["sha256"]),
+                file_name=document_path.name,
+                key=f"document_download_{d['id']}",
+            )
 
         target_doc = st.selectbox(
             "Select document to lock",
             options=documents,
-            format_func=lambda d: f"ID {d.id} | {d.doc_type} v{d.version} | {d.file_name}",
+            format_func=lambda d: f"ID {d['id']} | {d['doc_type']} v{d['version']} | {d['file_name']}",
         )
         if st.button("Lock selected document"):
-            session = SessionLocal()
-            try:
-                db_doc = session.get(Document, target_doc.id)
-                db_doc.is_locked = True
-                project = session.get(ProspectusProject, selected_project_id)
-                project.locked_final = True
+            with SessionLocal() as session:
+                # Both UPDATEs run in the session's single transaction; no rows are loaded first.
+                session.execute(update(Document).where(Document.id == target_doc["id"]).values(is_locked=True))
+                session.execute(
+                    update(ProspectusProject)
+                    .where(ProspectusProject.id == selected_project_id)
+                    .values(locked_final=True)
+                )
                 session.commit()
+                invalidate_documents()
+                list_projects.clear()
                 st.success("Selected document locked.")
-            finally:
-                session.close()
@@ -3,17 +3,31 @@ from pathlib import Path
 
 import streamlit as st
 from docx import Document as DocxDocument
+from sqlalchemy import insert
 
-from db.init_db import init_db
+from db.init_db import ensure_db_initialized
 from db.session import SessionLocal
-from models import Document, ProspectusProject, Template
+from models import Template
 from services.document_service import get_project_source_docx_documents
-from services.file_service import save_uploaded_file
+from services.file_cache import cached_template_placeholders, file_bytes_loader
+from services.file_service import link_or_copy, save_uploaded_file
 from services.parameterization_service import parameterize_template_from_source
-from services.placeholder_service import extract_placeholders_from_docx
 from services.prospectus_analysis_service import analyze_prospectus, save_analysis
+from services.queries import (
+    invalidate_templates,
+    list_documents,
+    list_projects,
+    list_templates,
+    list_templates_page,
+    templates_table,
+)
+
+ensure_db_initialized()
+
+
+def _set_template_page_cursor(before_id: int | None) -> None:
+    st.session_state["template_page_cursor"] = before_id
 
-init_db()
 
 st.title("TEMPLATES")
 st.caption("Manage your template library (upload, status, preview, inspection, and parameterization).")
@@ -32,78 +46,80 @@ if submitted:
         safe_name = f"{template_name.strip().replace(' ', '_')}_{uploaded_template.name}"
         file_path, file_sha256 = save_uploaded_file(uploaded_template, "storage/templates", safe_name)
 
-        session = SessionLocal()
-        try:
-            template = Template(
-                name=template_name.strip(),
-                status=status,
-                sha256=file_sha256,
-                file_path=str(file_path),
+        with SessionLocal() as session:
+            session.execute(
+                insert(Template).values(
+                    name=template_name.strip(),
+                    status=status,
+                    sha256=file_sha256,
+                    file_path=str(file_path),
+                )
             )
-            session.add(template)
             session.commit()
+            invalidate_templates()
             st.success("Template saved.")
-        finally:
-            session.close()
 
 st.divider()
 st.subheader("Template Library")
 
-session = SessionLocal()
-try:
-    templates = session.query(Template).order_by(Template.created_at.desc()).all()
-    projects = session.query(ProspectusProject).order_by(ProspectusProject.created_at.desc()).all()
-finally:
-    session.close()
+templates = list_templates()
+projects = list_projects()
 
-if not templates:
+# The library renders one keyset page at a time; the cursor is the smallest id already shown.
+page_cursor = st.session_state.setdefault("template_page_cursor", None)
+library_page, has_older_templates = list_templates_page(page_cursor)
+
+if library_page:
+    st.dataframe(templates_table(page_cursor), use_container_width=True)
+elif page_cursor is None:
     st.info("No templates available yet.")
 else:
-    table_data = [
-        {
-            "ID": t.id,
-            "Name": t.name,
-            "Status": t.status,
-            "Version": t.version,
-            "SHA256": t.sha256,
-            "Path": t.file_path,
-            "Created At": t.created_at,
-        }
-        for t in templates
-    ]
-    st.dataframe(table_data, use_container_width=True)
+    st.info("No older templates.")
+
+# Rendered outside the page branches so an emptied page (e.g. after deletions) can still go back.
+pager_left, pager_right = st.columns(2)
+if page_cursor is not None:
+    pager_left.button(
+        "Back to newest",
+        key="template_page_newest",
+        on_click=_set_template_page_cursor,
+        args=(None,),
+    )
+if has_older_templates:
+    pager_right.button(
+        "Show older",
+        key="template_page_older",
+        on_click=_set_template_page_cursor,
+        args=(library_page[-1]["id"],),
+    )
 
+if library_page:
     st.markdown("#### Downloads")
-    for t in templates:
-        template_path = Path(t.file_path)
-        if template_path.exists():
-            with template_path.open("rb") as f:
-                st.download_button(
-                    label=f"Download Template #{t.id}: {t.name}",
-                    data=f.read(),
-                    file_name=template_path.name,
-                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                    key=f"template_download_{t.id}",
-                )
-        else:
-            st.warning(f"File not found for template #{t.id}: {t.file_path}")
+    for t in library_page:
+        template_path = Path(t["file_path"])
+        st.download_button(
+            label=f"Download Template #{t['id']}: {t['name']}",
+            data=file_bytes_loader(template_path, t["sha256"]),
+            file_name=template_path.name,
+            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+            key=f"template_download_{t['id']}",
+        )
 
     st.divider()
     st.subheader("Inspect Template")
 
     inspect_template = st.selectbox(
         "Choose template to inspect",
-        options=templates,
-        format_func=lambda t: f"#{t.id} {t.name} (v{t.version})",
+        options=library_page,
+        format_func=lambda t: f"#{t['id']} {t['name']} (v{t['version']})",
         key="inspect_template_select",
     )
     if st.button("Inspect Template", key="inspect_template_button"):
-        inspect_path = Path(inspect_template.file_path)
+        inspect_path = Path(inspect_template["file_path"])
         if not inspect_path.exists():
-            st.error(f"Template file not found: {inspect_template.file_path}")
+            st.error(f"Template file not found: {inspect_template['file_path']}")
         else:
-            doc = DocxDocument(str(inspect_path))
-            placeholders = extract_placeholders_from_docx(doc)
+            placeholders = cached_template_placeholders(str(inspect_path), inspect_template["sha256"])
             st.write({"placeholder_count": len(placeholders), "placeholders": placeholders})
             if not placeholders:
                 st.info(
@@ -119,33 +135,25 @@ else:
     selected_project = st.selectbox(
         "Project",
         options=projects,
-        format_func=lambda p: f"#{p.id} {p.name}",
+        format_func=lambda p: f"#{p['id']} {p['name']}",
         key="param_project",
     )
 
-    session = SessionLocal()
-    try:
-        project_docs = get_project_source_docx_documents(session, selected_project.id)
-        project_docs_debug = (
-            session.query(Document)
-            .filter(Document.project_id == selected_project.id)
-            .order_by(Document.created_at.desc())
-            .all()
-        )
-    finally:
-        session.close()
+    with SessionLocal() as session:
+        project_docs = get_project_source_docx_documents(session, selected_project["id"])
+    project_docs_debug = list_documents(selected_project["id"])
 
     st.caption(f"Source DOCX found: {len(project_docs)}")
     with st.expander("Debug: Source DOCX discovery"):
-        st.write({"selected_project_id": selected_project.id})
+        st.write({"selected_project_id": selected_project["id"]})
         st.write(
             {
                 "docs_found": [
                     {
-                        "id": d.id,
-                        "filename": d.file_name,
-                        "document_type": d.doc_type,
-                        "path": d.file_path,
+                        "id": d["id"],
+                        "filename": d["file_name"],
+                        "document_type": d["doc_type"],
+                        "path": d["file_path"],
                     }
                     for d in project_docs_debug
                 ]
@@ -169,7 +177,7 @@ else:
                 base_template = st.selectbox(
                     "Base template",
                     options=templates,
-                    format_func=lambda t: f"#{t.id} {t.name} (v{t.version})",
+                    format_func=lambda t: f"#{t['id']} {t['name']} (v{t['version']})",
                     key="param_base_template",
                 )
             else:
@@ -211,24 +219,30 @@ else:
                 source_path = selected_source.file_path
 
                 if allow_source_as_base:
-                    file_bytes = Path(source_path).read_bytes()
-                    session = SessionLocal()
-                    try:
-                        source_as_template = Template(
-                            name=f"Source Template {selected_source.file_name}",
-                            status="draft",
-                            sha256=selected_source.sha256,
-                            file_path=source_path,
-                            metadata_json=json.dumps({"derived_from_document_id": selected_source.id}),
-                        )
-                        session.add(source_as_template)
+                    # The template gets its own path (a hard link, so no bytes are copied) so its
+                    # lifecycle is decoupled from the source document's file.
+                    template_file = link_or_copy(
+                        source_path,
+                        Path("storage/templates")
+                        / f"source_as_template_{selected_source.id}_{selected_source.sha256[:8]}.docx",
+                    )
+                    # RETURNING hands back the new id without a post-commit refresh SELECT.
+                    with SessionLocal() as session:
+                        base_template_id = session.execute(
+                            insert(Template)
+                            .values(
+                                name=f"Source Template {selected_source.file_name}",
+                                status="draft",
+                                sha256=selected_source.sha256,
+                                file_path=str(template_file),
+                                metadata_json=json.dumps({"derived_from_document_id": selected_source.id}),
+                            )
+                            .returning(Template.id)
+                        ).scalar_one()
                         session.commit()
-                        session.refresh(source_as_template)
-                        base_template_id = source_as_template.id
-                    finally:
-                        session.close()
+                    invalidate_templates()
                 else:
-                    base_template_id = base_template.id
+                    base_template_id = base_template["id"]
 
                 inputs = {
                     "issuer": {
@@ -244,17 +258,24 @@ else:
                     },
                 }
 
-                analysis = analyze_prospectus(source_path, issuer_name=issuer_name.strip(), offer_shares=int(offer_shares))
-                analysis_id = save_analysis(selected_project.id, selected_source.id, analysis)
+                # Parsed once for both services; parameterize edits this copy in place after analysis.
+                source_docx = DocxDocument(source_path)
+                analysis = analyze_prospectus(
+                    source_path, issuer_name=issuer_name.strip(), offer_shares=int(offer_shares), document=source_docx
+                )
+                analysis_id = save_analysis(selected_project["id"], selected_source.id, analysis)
 
                 result = parameterize_template_from_source(
                     source_docx_path=source_path,
+                    document=source_docx,
                     inputs=inputs,
                     base_template_id=base_template_id,
                     source_document_id=selected_source.id,
-                    project_id=selected_project.id,
+                    project_id=selected_project["id"],
                     dry_run=dry_run,
                 )
+                if not dry_run:
+                    invalidate_templates()
                 if dry_run:
                     st.success(f"Dry run complete. No file was written. Analysis #{analysis_id} saved.")
                 else:
@@ -1,58 +1,66 @@
-import json
 from pathlib import Path
 from typing import Any
 
 import streamlit as st
 
-from db.init_db import init_db
+from db.init_db import ensure_db_initialized
 from db.session import SessionLocal
-from models import Document, ProspectusProject, Template
+from services import json_codec
 from services.auto_generation_form_service import (
     build_raw_inputs_payload,
     build_template_form_spec,
-    extract_template_placeholders,
     find_unresolved_template_placeholders,
     load_schema,
     validate_required_paths,
 )
 from services.deal_profile_service import get_latest_profile, save_profile
-from services.document_service import extract_preview_and_outline
+from services.file_cache import cached_preview_and_outline, cached_template_placeholders
 from services.generation_service import generate_draft_docx
 from services.normalization_service import normalize_inputs
+from services.queries import (
+    invalidate_documents,
+    list_documents,
+    list_projects,
+    list_templates,
+)
 
-init_db()
+ensure_db_initialized()
 
 st.title("AUTO GENERATION")
 st.caption("Schema-driven deal inputs + assembly + generation runs.")
 
-session = SessionLocal()
-try:
-    templates = session.query(Template).order_by(Template.created_at.desc()).all()
-    projects = session.query(ProspectusProject).order_by(ProspectusProject.created_at.desc()).all()
-finally:
-    session.close()
+templates = list_templates()
+projects = list_projects()
 
 if not templates or not projects:
     st.info("You need at least one template and one project to start generation.")
     st.stop()
 
+
+# The schema file is immutable at runtime, so one parsed copy (and its path index) is shared by all sessions.
+# Load errors are not cached, so a fixed file is picked up on the next rerun.
+# field_ui precomputes each field's widget state key, help text and split path once per process.
+@st.cache_resource(show_spinner=False)
+def _load_schema_and_field_meta() -> tuple[dict[str, Any], dict[str, dict[str, Any]], dict[str, dict[str, Any]]]:
+    loaded_schema = load_schema()
+    meta = loaded_schema["_fields_by_path"]
+    ui = {
+        path: {
+            "state_key": f"deal_input__{path.replace('.', '__')}",
+            "help": f"{field['help_text']} Example: {field['example']}",
+            "parts": tuple(path.split(".")),
+        }
+        for path, field in meta.items()
+    }
+    return loaded_schema, meta, ui
+
+
 try:
-    schema = load_schema()
+    schema, field_meta, field_ui = _load_schema_and_field_meta()
 except (FileNotFoundError, ValueError) as exc:
     st.error(str(exc))
     st.stop()
 
-field_meta = {field["path"]: field for field in schema["fields"]}
-
-
-def _field_help(path: str) -> str:
-    field = field_meta[path]
-    return f"{field['help_text']} Example: {field['example']}"
-
-
-def _field_state_key(path: str) -> str:
-    return f"deal_input__{path.replace('.', '__')}"
-
 
 def _coerce_loaded_value(path: str, value: Any) -> Any:
     field_type = field_meta[path]["type"]
@@ -65,12 +73,12 @@ def _coerce_loaded_value(path: str, value: Any) -> Any:
 
 def _set_form_values(values_by_path: dict[str, Any]) -> None:
     for path, value in values_by_path.items():
-        st.session_state[_field_state_key(path)] = _coerce_loaded_value(path, value)
+        st.session_state[field_ui[path]["state_key"]] = _coerce_loaded_value(path, value)
 
 
-def _deep_get(data: dict[str, Any], path: str) -> Any:
+def _deep_get(data: dict[str, Any], parts: tuple[str, ...]) -> Any:
     current: Any = data
-    for part in path.split("."):
+    for part in parts:
         if not isinstance(current, dict) or part not in current:
             return None
         current = current[part]
@@ -78,13 +86,27 @@ def _deep_get(data: dict[str, Any], path: str) -> Any:
 
 
 def _extract_values_for_paths(payload: dict[str, Any], paths: list[str]) -> dict[str, Any]:
-    return {path: _deep_get(payload, path) for path in paths}
+    return {path: _deep_get(payload, field_ui[path]["parts"]) for path in paths}
+
+
+# Every keystroke reruns the page; these only recompute when their (hashable) inputs change.
+# The leading underscore keeps the schema dict out of the cache key; schema_id stands in for it.
+@st.cache_data(show_spinner=False, max_entries=16)
+def _form_spec_cached(
+    template_placeholders: tuple[str, ...], schema_id: str, _schema: dict[str, Any]
+) -> dict[str, Any]:
+    return build_template_form_spec(list(template_placeholders), _schema)
 
 
-template = st.selectbox("Template", options=templates, format_func=lambda t: f"#{t.id} {t.name} ({t.status})")
-project = st.selectbox("Project", options=projects, format_func=lambda p: f"#{p.id} {p.name}")
+@st.cache_data(show_spinner=False, max_entries=16)
+def _normalize_cached(schema_id: str, payload_json: str) -> tuple[dict[str, Any], dict[str, str], list[str]]:
+    return normalize_inputs(schema_id, payload_json)
 
-template_placeholders = extract_template_placeholders(Path(template.file_path))
+
+template = st.selectbox("Template", options=templates, format_func=lambda t: f"#{t['id']} {t['name']} ({t['status']})")
+project = st.selectbox("Project", options=projects, format_func=lambda p: f"#{p['id']} {p['name']}")
+
+template_placeholders = cached_template_placeholders(template["file_path"], template["sha256"])
 if not template_placeholders:
     st.error(
         "Selected template has placeholder_count=0. Generation is blocked. "
@@ -92,32 +114,25 @@ if not template_placeholders:
     )
     st.stop()
 
-form_spec = build_template_form_spec(template_placeholders, schema)
+form_spec = _form_spec_cached(tuple(template_placeholders), schema["schema_id"], schema)
 if not form_spec["fields"]:
     st.warning("No Talabat schema-mapped placeholders were detected in this template.")
 
-session = SessionLocal()
-try:
-    project_documents = (
-        session.query(Document)
-        .filter(Document.project_id == project.id)
-        .order_by(Document.created_at.desc())
-        .all()
-    )
-finally:
-    session.close()
+project_documents = list_documents(project["id"])
 
 use_template_as_source = False
 source_document = None
-source_for_preview_path = template.file_path
+source_for_preview_path = template["file_path"]
+source_for_preview_sha256 = template["sha256"]
 
 if project_documents:
     source_document = st.selectbox(
         "Source document",
         options=project_documents,
-        format_func=lambda d: f"#{d.id} {d.doc_type} v{d.version} ({d.file_name})",
+        format_func=lambda d: f"#{d['id']} {d['doc_type']} v{d['version']} ({d['file_name']})",
     )
-    source_for_preview_path = source_document.file_path
+    source_for_preview_path = source_document["file_path"]
+    source_for_preview_sha256 = source_document["sha256"]
 else:
     st.warning("Selected project has no documents.")
     use_template_as_source = st.checkbox(
@@ -128,24 +143,28 @@ else:
         st.info("Enable the checkbox above to preview from the template and generate without a project upload.")
 
 if source_document is not None or use_template_as_source:
-    preview_data = extract_preview_and_outline(source_for_preview_path)
-
     st.divider()
-    left, right = st.columns(2)
-    with left:
-        st.subheader("Extracted Text Preview")
-        st.text_area("Preview", value=preview_data["preview"] or "(empty text)", height=260, disabled=True)
-
-    with right:
-        st.subheader("Outline JSON Preview")
-        st.code(json.dumps(preview_data["outline"], indent=2), language="json")
-
-latest_profile = get_latest_profile(project.id, schema["schema_id"], template.id)
+    # on_change="rerun" tracks the open state, so the source is only parsed while the preview is open.
+    preview_expander = st.expander("Preview source document", key="source_preview_expander", on_change="rerun")
+    with preview_expander:
+        if preview_expander.open:
+            preview_data = cached_preview_and_outline(source_for_preview_path, source_for_preview_sha256)
+
+            left, right = st.columns(2)
+            with left:
+                st.subheader("Extracted Text Preview")
+                st.text_area("Preview", value=preview_data["preview"] or "(empty text)", height=260, disabled=True)
+
+            with right:
+                st.subheader("Outline JSON Preview")
+                st.code(preview_data["outline_pretty_json"], language="json")
+
+latest_profile = get_latest_profile(project["id"], schema["schema_id"], template["id"])
 profile_available = latest_profile is not None
 load_profile = st.toggle("Load last saved deal profile", value=profile_available)
 if load_profile and latest_profile is not None:
     if st.button("Load profile values into form", key="load_deal_profile_values"):
-        loaded_payload = json.loads(latest_profile.inputs_raw_json)
+        loaded_payload = json_codec.loads(latest_profile.inputs_raw_json)
         _set_form_values(_extract_values_for_paths(loaded_payload, form_spec["requested_paths"]))
         st.success("Loaded last saved deal profile values.")
 elif load_profile and latest_profile is None:
@@ -154,62 +173,69 @@ elif load_profile and latest_profile is None:
 st.divider()
 st.subheader("Deal Profile Inputs (template placeholders only)")
 
-field_values: dict[str, Any] = {}
-for field in form_spec["fields"]:
-    path = field["path"]
-    key = _field_state_key(path)
-    label = field["label"]
-    help_text = _field_help(path)
-
-    field_type = field["type"]
-    if field_type in {"string", "rich_text"}:
-        widget = st.text_area if field_type == "rich_text" else st.text_input
-        if key not in st.session_state:
-            st.session_state[key] = ""
-        field_values[path] = widget(label, key=key, help=help_text)
-    elif field_type == "list_string":
-        if key not in st.session_state:
-            st.session_state[key] = ""
-        field_values[path] = st.text_area(
-            f"{label} (one per line)",
-            key=key,
-            help=help_text,
-        )
-    elif field_type == "integer":
-        if key not in st.session_state:
-            st.session_state[key] = 0
-        field_values[path] = st.number_input(label, step=1, key=key, help=help_text)
-    elif field_type in {"decimal", "percent"}:
-        if key not in st.session_state:
-            st.session_state[key] = 0.0
-        field_values[path] = st.number_input(
-            label,
-            step=0.01,
-            format="%.2f",
-            key=key,
-            help=help_text,
-        )
+# Inputs live in a form so typing does not rerun the page; values commit on either submit button.
+with st.form("deal_inputs"):
+    field_values: dict[str, Any] = {}
+    for field in form_spec["fields"]:
+        path = field["path"]
+        key = field_ui[path]["state_key"]
+        label = field["label"]
+        help_text = field_ui[path]["help"]
+
+        field_type = field["type"]
+        if field_type in {"string", "rich_text"}:
+            widget = st.text_area if field_type == "rich_text" else st.text_input
+            if key not in st.session_state:
+                st.session_state[key] = ""
+            field_values[path] = widget(label, key=key, help=help_text)
+        elif field_type == "list_string":
+            if key not in st.session_state:
+                st.session_state[key] = ""
+            field_values[path] = st.text_area(
+                f"{label} (one per line)",
+                key=key,
+                help=help_text,
+            )
+        elif field_type == "integer":
+            if key not in st.session_state:
+                st.session_state[key] = 0
+            field_values[path] = st.number_input(label, step=1, key=key, help=help_text)
+        elif field_type in {"decimal", "percent"}:
+            if key not in st.session_state:
+                st.session_state[key] = 0.0
+            field_values[path] = st.number_input(
+                label,
+                step=0.01,
+                format="%.2f",
+                key=key,
+                help=help_text,
+            )
+
+    confirm_disclaimer = st.checkbox(
+        "I confirm all facts are verified and that missing facts are marked as TBD or [[MISSING: field]]."
+    )
+    st.form_submit_button("Update preview")
+    generate_requested = st.form_submit_button("Generate")
 
-source_document_id = source_document.id if source_document is not None else None
+source_document_id = source_document["id"] if source_document is not None else None
 raw_inputs_payload = build_raw_inputs_payload(
     schema_id=schema["schema_id"],
-    project_id=project.id,
-    template_id=template.id,
+    project_id=project["id"],
+    template_id=template["id"],
     source_document_id=source_document_id,
     use_template_as_source=use_template_as_source,
     field_values=field_values,
 )
 
-normalized_payload, rendered_preview, _ = normalize_inputs(schema["schema_id"], raw_inputs_payload)
+normalized_payload, rendered_preview, _ = _normalize_cached(
+    schema["schema_id"], json_codec.dumps(raw_inputs_payload, sort_keys=True)
+)
 
 st.subheader("Normalized Preview")
-st.json({key: rendered_preview[key] for key in sorted(rendered_preview) if key in template_placeholders})
-
-confirm_disclaimer = st.checkbox(
-    "I confirm all facts are verified and that missing facts are marked as TBD or [[MISSING: field]]."
-)
+# template_placeholders is already sorted, so walking it keeps the display order without a re-sort.
+st.json({key: rendered_preview[key] for key in template_placeholders if key in rendered_preview})
 
-if st.button("Generate"):
+if generate_requested:
     required_errors = validate_required_paths(form_spec["required_paths"], raw_inputs_payload, rendered_preview)
     unresolved_fields = find_unresolved_template_placeholders(template_placeholders, rendered_preview)
 
@@ -222,15 +248,19 @@ if st.button("Generate"):
     elif not confirm_disclaimer:
         st.error("You must confirm the disclaimer before generating.")
     else:
-        save_profile(
-            project_id=project.id,
-            schema_id=schema["schema_id"],
-            template_id=template.id,
-            inputs_raw=raw_inputs_payload,
-            inputs_normalized=normalized_payload,
-        )
+        # Both writes share one session, so a Generate click checks out a single pooled connection.
+        with SessionLocal() as session:
+            save_profile(
+                project_id=project["id"],
+                schema_id=schema["schema_id"],
+                template_id=template["id"],
+                inputs_raw=raw_inputs_payload,
+                inputs_normalized=normalized_payload,
+                session=session,
+            )
 
-        result = generate_draft_docx(project.id, template.id, normalized_payload)
+            result = generate_draft_docx(project["id"], template["id"], normalized_payload, session=session)
+        invalidate_documents()
 
         output_path = Path(result["output_path"])
         st.success(f"Generation run #{result['generation_run_id']} completed.")
@@ -238,11 +268,11 @@ if st.button("Generate"):
         if unresolved_fields:
             st.warning("Missing fields (template placeholders only): " + ", ".join(unresolved_fields))
 
-        with output_path.open("rb") as generated_file:
-            st.download_button(
-                label="Download Generated Draft DOCX",
-                data=generated_file.read(),
-                file_name=output_path.name,
-                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                key=f"generated_download_{result['document_id']}",
-            )
+        # A one-off draft: read lazily on click, not worth a slot in the sha256 file cache.
+        st.download_button(
+            label="Download Generated Draft DOCX",
+            data=output_path.read_bytes,
+            file_name=output_path.name,
+            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+            key=f"generated_download_{result['document_id']}",
+        )
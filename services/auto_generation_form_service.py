@@ -1,14 +1,13 @@
 import json
-from collections.abc import Mapping
+from collections.abc import Iterable, Mapping
 from pathlib import Path
 from typing import Any
 
-from docx import Document as DocxDocument
-
-from services.placeholder_service import extract_placeholders_from_docx
+from services.placeholder_service import extract_placeholders_from_docx_path
 
 SCHEMA_PATH = Path("prompts/input_schema_talabat.json")
 SUPPORTED_SCHEMA_ID = "talabat_v1"
+_MISSING_PREFIX = "[[MISSING:"
 
 FIELD_DEFAULTS: dict[str, Any] = {
     "issuer.name": "",
@@ -32,18 +31,26 @@ DERIVED_PLACEHOLDER_DEPENDENCIES: dict[str, list[str]] = {
 }
 
 
-def _deep_get(data: Mapping[str, Any], path: str) -> Any:
-    current: Any = data
-    for part in path.split("."):
-        if not isinstance(current, Mapping) or part not in current:
-            return None
-        current = current[part]
-    return current
+def _flatten(data: Mapping[str, Any], prefix: str = "", flat: dict[str, Any] | None = None) -> dict[str, Any]:
+    if flat is None:
+        flat = {}
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        flat[path] = value
+        if isinstance(value, Mapping):
+            _flatten(value, f"{path}.", flat)
+    return flat
+
 
+# Dotted paths split once at import; payload assembly runs on every Auto Generation rerun.
+_FIELD_DEFAULT_PARTS: tuple[tuple[str, tuple[str, ...], Any], ...] = tuple(
+    (path, tuple(path.split(".")), default) for path, default in FIELD_DEFAULTS.items()
+)
+_CURRENCY_PARTS = ("offer", "currency")
 
-def _deep_set(data: dict[str, Any], path: str, value: Any) -> None:
+
+def _deep_set(data: dict[str, Any], parts: tuple[str, ...], value: Any) -> None:
     current = data
-    parts = path.split(".")
     for part in parts[:-1]:
         if part not in current or not isinstance(current[part], dict):
             current[part] = {}
@@ -52,21 +59,31 @@ def _deep_set(data: dict[str, Any], path: str, value: Any) -> None:
 
 
 def load_schema() -> dict[str, Any]:
-    if not SCHEMA_PATH.exists():
-        raise FileNotFoundError(f"Talabat schema file is missing: {SCHEMA_PATH}")
-    schema = json.loads(SCHEMA_PATH.read_text())
+    try:
+        schema = json.loads(SCHEMA_PATH.read_text())
+    except FileNotFoundError as exc:
+        raise FileNotFoundError(f"Talabat schema file is missing: {SCHEMA_PATH}") from exc
     if schema.get("schema_id") != SUPPORTED_SCHEMA_ID:
         raise ValueError(f"Unsupported schema file: {schema.get('schema_id')}")
+    _index_schema_fields(schema)
     return schema
 
 
+# Indexes are attached to the schema dict so every form-spec build can reuse them.
+def _index_schema_fields(schema: dict[str, Any]) -> None:
+    schema["_fields_by_path"] = {field["path"]: field for field in schema["fields"]}
+    schema["_required_paths"] = frozenset(field["path"] for field in schema["fields"] if field.get("required"))
+
+
 def extract_template_placeholders(template_path: str | Path) -> list[str]:
-    document = DocxDocument(str(template_path))
-    return extract_placeholders_from_docx(document)
+    return extract_placeholders_from_docx_path(template_path)
 
 
 def build_template_form_spec(template_placeholders: list[str], schema: Mapping[str, Any]) -> dict[str, Any]:
-    schema_fields = {field["path"]: field for field in schema["fields"]}
+    if "_fields_by_path" not in schema:
+        schema = dict(schema)
+        _index_schema_fields(schema)
+    schema_fields = schema["_fields_by_path"]
 
     requested_paths: set[str] = set()
     for placeholder in template_placeholders:
@@ -76,7 +93,7 @@ def build_template_form_spec(template_placeholders: list[str], schema: Mapping[s
         requested_paths.update(DERIVED_PLACEHOLDER_DEPENDENCIES.get(placeholder, []))
 
     requested_fields = [schema_fields[path] for path in schema_fields if path in requested_paths]
-    required_paths = {field["path"] for field in requested_fields if field.get("required")}
+    required_paths = requested_paths & schema["_required_paths"]
 
     return {
         "schema_id": schema["schema_id"],
@@ -102,26 +119,30 @@ def build_raw_inputs_payload(
         "use_template_as_source": use_template_as_source,
     }
 
-    for path, default in FIELD_DEFAULTS.items():
+    for path, parts, default in _FIELD_DEFAULT_PARTS:
         value = field_values.get(path, default)
         if path == "risk_factors" and isinstance(value, str):
             value = [line.strip() for line in value.splitlines() if line.strip()]
-        _deep_set(payload, path, value)
+        _deep_set(payload, parts, value)
 
-    _deep_set(payload, "offer.currency", "AED")
+    _deep_set(payload, _CURRENCY_PARTS, "AED")
     return payload
 
 
+def _is_missing(rendered_value: Any) -> bool:
+    # Rendered values are strings; skip the str() coercion the marker check used to pay per field.
+    return rendered_value is None or (isinstance(rendered_value, str) and rendered_value.startswith(_MISSING_PREFIX))
+
+
 def find_unresolved_template_placeholders(
-    template_placeholders: list[str],
+    template_placeholders: Iterable[str],
     rendered_map: Mapping[str, str],
 ) -> list[str]:
-    unresolved: list[str] = []
-    for placeholder in template_placeholders:
-        value = rendered_map.get(placeholder)
-        if value is None or str(value).startswith("[[MISSING:"):
-            unresolved.append(placeholder)
-    return sorted(set(unresolved))
+    unresolved: set[str] = set()
+    for placeholder in set(template_placeholders):
+        if _is_missing(rendered_map.get(placeholder)):
+            unresolved.add(placeholder)
+    return sorted(unresolved)
 
 
 def validate_required_paths(
@@ -130,12 +151,12 @@ def validate_required_paths(
     rendered_map: Mapping[str, str],
 ) -> list[str]:
     errors: list[str] = []
+    raw_values = _flatten(raw_payload)
     for path in required_paths:
-        rendered_value = rendered_map.get(path)
-        if rendered_value is not None and not str(rendered_value).startswith("[[MISSING:"):
+        if not _is_missing(rendered_map.get(path)):
             continue
 
-        raw_value = _deep_get(raw_payload, path)
+        raw_value = raw_values.get(path)
         if raw_value is None:
             errors.append(f"{path} is required.")
             continue
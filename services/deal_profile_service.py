@@ -1,10 +1,11 @@
-import json
 from collections.abc import Mapping
-from datetime import datetime
 from typing import Any
 
+from sqlalchemy.orm import Session
+
 from db.session import SessionLocal
 from models import DealProfile
+from services import json_codec
 
 
 def get_latest_profile(project_id: int, schema_id: str, template_id: int | None = None) -> DealProfile | None:
@@ -28,26 +29,30 @@ def save_profile(
     template_id: int | None,
     inputs_raw: str | Mapping[str, Any],
     inputs_normalized: str | Mapping[str, Any],
+    session: Session | None = None,
 ) -> DealProfile:
-    raw_json = inputs_raw if isinstance(inputs_raw, str) else json.dumps(dict(inputs_raw))
-    normalized_json = inputs_normalized if isinstance(inputs_normalized, str) else json.dumps(dict(inputs_normalized))
+    raw_json = inputs_raw if isinstance(inputs_raw, str) else json_codec.dumps(dict(inputs_raw))
+    normalized_json = inputs_normalized if isinstance(inputs_normalized, str) else json_codec.dumps(dict(inputs_normalized))
 
-    session = SessionLocal()
+    # Callers may pass their own session to share one connection checkout; they also close it.
+    owns_session = session is None
+    if owns_session:
+        session = SessionLocal()
     try:
-        now = datetime.utcnow()
         profile = DealProfile(
             project_id=project_id,
             template_id=template_id,
             schema_id=schema_id,
             inputs_raw_json=raw_json,
             inputs_normalized_json=normalized_json,
-            created_at=now,
-            updated_at=now,
         )
         session.add(profile)
-        session.commit()
-        session.refresh(profile)
+        # Detach once the flush has filled id and defaults: commit() then has nothing to expire,
+        # so the returned profile stays readable without a refresh SELECT.
+        session.flush()
         session.expunge(profile)
+        session.commit()
         return profile
     finally:
-        session.close()
+        if owns_session:
+            session.close()
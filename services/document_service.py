@@ -1,9 +1,22 @@
+import re
 from pathlib import Path
+from typing import Any
 
+from docx import Document as DocxDocument
+from pypdf import PdfReader
+from sqlalchemy import Row, select
 from sqlalchemy.orm import Session
 
 from models import Document
 
+# Optional: PDFium extracts text in C, far faster than pypdf on large prospectuses.
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+HEADING_NUMBERED_PATTERN = re.compile(r"^(\d+(?:\.\d+)*)[\).\-:]?\s+.+$")
+
 
 def normalize_document_type(file_name: str | None) -> str:
     suffix = Path(file_name or "").suffix.lower()
@@ -14,10 +27,72 @@ def normalize_document_type(file_name: str | None) -> str:
     return "unknown"
 
 
-def get_project_source_docx_documents(session: Session, project_id: int) -> list[Document]:
-    return (
-        session.query(Document)
-        .filter(Document.project_id == project_id, Document.doc_type == "docx")
+# Column rows keep attribute access (d.id, d.file_path) without hydrating Document instances.
+def get_project_source_docx_documents(session: Session, project_id: int) -> list[Row]:
+    return session.execute(
+        select(
+            Document.id,
+            Document.project_id,
+            Document.doc_type,
+            Document.version,
+            Document.file_name,
+            Document.file_path,
+            Document.sha256,
+        )
+        .where(Document.project_id == project_id, Document.doc_type == "docx")
         .order_by(Document.created_at.desc())
-        .all()
-    )
+    ).all()
+
+
+def _extract_pdf_text(file_path: Path) -> str:
+    if pdfium is None:
+        reader = PdfReader(str(file_path))
+        return "\n".join(page.extract_text() or "" for page in reader.pages).strip()
+
+    pdf = pdfium.PdfDocument(str(file_path))
+    try:
+        page_texts: list[str] = []
+        for index in range(len(pdf)):
+            page = pdf[index]
+            text_page = page.get_textpage()
+            page_texts.append(text_page.get_text_range())
+            text_page.close()
+            page.close()
+    finally:
+        pdf.close()
+    # PDFium reports line breaks as CRLF; keep the "\n" lines the outline detection expects.
+    return "\n".join(page_texts).replace("\r\n", "\n").strip()
+
+
+def extract_text(path: str | Path) -> str:
+    file_path = Path(path)
+    suffix = file_path.suffix.lower()
+    if suffix == ".pdf":
+        return _extract_pdf_text(file_path)
+    if suffix == ".docx":
+        document = DocxDocument(str(file_path))
+        return "\n".join(paragraph.text for paragraph in document.paragraphs).strip()
+    return ""
+
+
+def detect_outline(text: str) -> list[dict[str, Any]]:
+    outline: list[dict[str, Any]] = []
+    for line in text.split("\n"):
+        cleaned = line.strip()
+        if not cleaned:
+            continue
+        if cleaned.isupper() and len(cleaned) > 3:
+            outline.append({"title": cleaned, "level": 1})
+            continue
+        # Numbered headings start with a digit; skip the regex call for ordinary body lines.
+        if not cleaned[0].isdecimal():
+            continue
+        match = HEADING_NUMBERED_PATTERN.match(cleaned)
+        if match:
+            outline.append({"title": cleaned, "level": match.group(1).count(".") + 1})
+    return outline
+
+
+def extract_preview_and_outline(path: str | Path, preview_chars: int = 2000) -> dict[str, Any]:
+    text = extract_text(path)
+    return {"preview": text[:preview_chars], "outline": detect_outline(text)}
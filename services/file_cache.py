@@ -0,0 +1,52 @@
+import copy
+import json
+from collections.abc import Callable
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+import streamlit as st
+from docx import Document as DocxDocument
+from docx.document import Document as DocxDocumentType
+
+from services.auto_generation_form_service import extract_template_placeholders
+from services.document_service import extract_preview_and_outline
+
+
+# Stored files are immutable once their sha256 is recorded, so the hash is a safe cache key;
+# a file replaced in place carries a new hash and simply misses.
+@st.cache_data(max_entries=64, show_spinner=False)
+def read_file_bytes(path: str, sha256: str) -> bytes:
+    return Path(path).read_bytes()
+
+
+def file_bytes_loader(path: str | Path, sha256: str) -> Callable[[], bytes]:
+    # Zero-argument callable for st.download_button(data=...): nothing is read until a click.
+    return partial(read_file_bytes, str(path), sha256)
+
+
+# Parsing results are keyed the same way: the sha256 argument only serves as the cache key.
+@st.cache_data(max_entries=64, show_spinner=False)
+def cached_template_placeholders(path: str, sha256: str) -> list[str]:
+    return extract_template_placeholders(path)
+
+
+# The pretty-printed outline is cached with it so reruns skip the json.dumps(indent=2) pass.
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_preview_and_outline(path: str, sha256: str, preview_chars: int = 2000) -> dict[str, Any]:
+    preview_data = extract_preview_and_outline(path, preview_chars)
+    preview_data["outline_pretty_json"] = json.dumps(preview_data["outline"], indent=2)
+    return preview_data
+
+
+# Parsed once per file version; stat() keys the entry so a file rewritten in place misses.
+@st.cache_resource(max_entries=16, show_spinner=False)
+def _parsed_docx(path: str, mtime_ns: int, size: int) -> DocxDocumentType:
+    return DocxDocument(path)
+
+
+def load_docx_copy(path: str | Path) -> DocxDocumentType:
+    # Callers edit and save the document, so each gets a private deep copy of the cached parse;
+    # copying the tree is several times cheaper than unzipping and parsing the package again.
+    stat = Path(path).stat()
+    return copy.deepcopy(_parsed_docx(str(path), stat.st_mtime_ns, stat.st_size))
@@ -1,6 +1,10 @@
 import hashlib
+import os
+import shutil
 from pathlib import Path
 
+FILE_CHUNK_SIZE = 1 << 20
+
 
 def ensure_dir(path: str | Path) -> Path:
     target = Path(path)
@@ -12,10 +16,38 @@ def sha256_bytes(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
 
 
+def sha256_file(path: str | Path) -> str:
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as source:
+        while chunk := source.read(FILE_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 def save_uploaded_file(uploaded_file, destination_dir: str | Path, destination_name: str | None = None):
     target_dir = ensure_dir(destination_dir)
     file_name = destination_name or uploaded_file.name
-    file_bytes = uploaded_file.getvalue()
     target_path = target_dir / file_name
-    target_path.write_bytes(file_bytes)
-    return target_path, sha256_bytes(file_bytes)
+    # Hash while writing in chunks so the upload is never held twice in memory or re-read from disk.
+    digest = hashlib.sha256()
+    uploaded_file.seek(0)
+    with target_path.open("wb") as out:
+        while chunk := uploaded_file.read(FILE_CHUNK_SIZE):
+            digest.update(chunk)
+            out.write(chunk)
+    return target_path, digest.hexdigest()
+
+
+def link_or_copy(source: str | Path, destination: str | Path) -> Path:
+    # Hard link when possible (no bytes copied); fall back to a copy across devices or on
+    # filesystems without link support. Callers use content-addressed names, so an existing
+    # destination already holds the same bytes.
+    target = Path(destination)
+    ensure_dir(target.parent)
+    try:
+        os.link(source, target)
+    except FileExistsError:
+        pass
+    except OSError:
+        shutil.copyfile(source, target)
+    return target
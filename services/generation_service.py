@@ -1,15 +1,19 @@
-import json
 import shutil
 from pathlib import Path
 from typing import Any
 
 from docx import Document as DocxDocument
-from docx.oxml import OxmlElement
+from docx.oxml.ns import nsmap, qn
+from docx.oxml.parser import oxml_parser
 from docx.text.paragraph import Paragraph
+from sqlalchemy import func
+from sqlalchemy.orm import Session
 
 from db.session import SessionLocal
 from models import Document, GenerationRun, Template
-from services.file_service import ensure_dir, sha256_bytes
+from services import json_codec
+from services.file_cache import load_docx_copy
+from services.file_service import ensure_dir, sha256_file
 from services.normalization_service import normalize_inputs
 from services.placeholder_service import (
     extract_missing_markers,
@@ -17,17 +21,10 @@ from services.placeholder_service import (
     replace_placeholders_in_docx,
 )
 
-
-def _insert_paragraph_at_start(document: DocxDocument, text: str) -> None:
-    if not document.paragraphs:
-        document.add_paragraph(text)
-        return
-
-    first_paragraph = document.paragraphs[0]
-    paragraph_xml = OxmlElement("w:p")
-    first_paragraph._p.addprevious(paragraph_xml)  # noqa: SLF001
-    paragraph = Paragraph(paragraph_xml, first_paragraph._parent)  # noqa: SLF001
-    paragraph.add_run(text)
+# Resolved once: OxmlElement re-parses the "w:p" prefix for every element it creates. The python-docx
+# parser still yields its CT_P class, so the new element works with Paragraph.add_run.
+W_P_TAG = qn("w:p")
+W_NSMAP = {"w": nsmap["w"]}
 
 
 def _prepend_missing_information(document: DocxDocument, missing_fields: list[str]) -> None:
@@ -38,34 +35,43 @@ def _prepend_missing_information(document: DocxDocument, missing_fields: list[st
     lines.insert(0, "Missing Information")
     lines.insert(1, "")
 
-    for line in reversed(lines):
-        _insert_paragraph_at_start(document, line)
+    paragraphs = document.paragraphs
+    if not paragraphs:
+        for line in lines:
+            document.add_paragraph(line)
+        return
+
+    # Resolve the anchor once; document.paragraphs rebuilds a wrapper for every body paragraph.
+    first_paragraph = paragraphs[0]
+    for line in lines:
+        paragraph_xml = oxml_parser.makeelement(W_P_TAG, nsmap=W_NSMAP)
+        first_paragraph._p.addprevious(paragraph_xml)  # noqa: SLF001
+        Paragraph(paragraph_xml, first_paragraph._parent).add_run(line)  # noqa: SLF001
 
 
 def _next_document_version(session, project_id: int, doc_type: str) -> int:
-    latest = (
-        session.query(Document)
+    latest_version = (
+        session.query(func.coalesce(func.max(Document.version), 0))
         .filter(Document.project_id == project_id, Document.doc_type == doc_type)
-        .order_by(Document.version.desc())
-        .first()
+        .scalar()
     )
-    return 1 if latest is None else latest.version + 1
+    return latest_version + 1
 
 
-def _create_source_document_from_template(
+def _build_source_document_from_template(
     session,
     project_id: int,
     template_id: int,
     template_path: Path,
-) -> int:
+) -> Document:
     source_dir = ensure_dir(Path("storage") / "projects" / str(project_id) / "source")
     source_version = _next_document_version(session, project_id, "original")
     source_name = f"source_v{source_version}_template_{template_id}.docx"
     source_path = source_dir / source_name
     shutil.copyfile(template_path, source_path)
 
-    source_sha256 = sha256_bytes(source_path.read_bytes())
-    source_document = Document(
+    source_sha256 = sha256_file(source_path)
+    return Document(
         project_id=project_id,
         doc_type="original",
         file_name=source_name,
@@ -74,17 +80,21 @@ def _create_source_document_from_template(
         version=source_version,
         is_locked=False,
     )
-    session.add(source_document)
-    session.flush()
-    return source_document.id
 
 
-def generate_draft_docx(project_id: int, template_id: int, inputs_json: str | dict[str, Any]) -> dict[str, Any]:
-    inputs_payload = inputs_json if isinstance(inputs_json, dict) else json.loads(inputs_json)
+def generate_draft_docx(
+    project_id: int,
+    template_id: int,
+    inputs_json: str | dict[str, Any],
+    session: Session | None = None,
+) -> dict[str, Any]:
+    inputs_payload = inputs_json if isinstance(inputs_json, dict) else json_codec.loads(inputs_json)
     schema_id = str(inputs_payload.get("schema_id") or "talabat_v1")
     normalized_inputs, rendered_fields_map, normalization_missing = normalize_inputs(schema_id, inputs_payload)
 
-    session = SessionLocal()
+    owns_session = session is None
+    if owns_session:
+        session = SessionLocal()
     try:
         template = session.get(Template, template_id)
         if template is None:
@@ -95,23 +105,27 @@ def generate_draft_docx(project_id: int, template_id: int, inputs_json: str | di
             raise FileNotFoundError(f"Template file not found: {template.file_path}")
 
         source_document_id = normalized_inputs.get("source_document_id")
+        source_document = None
         if source_document_id is None and normalized_inputs.get("use_template_as_source"):
-            source_document_id = _create_source_document_from_template(
+            source_document = _build_source_document_from_template(
                 session=session,
                 project_id=project_id,
                 template_id=template_id,
                 template_path=template_path,
             )
-            normalized_inputs["source_document_id"] = source_document_id
 
-        document = DocxDocument(str(template_path))
+        document = load_docx_copy(template_path)
         template_placeholders = extract_placeholders_from_docx(document)
         replaced_missing = replace_placeholders_in_docx(document, normalized_inputs)
         marker_missing = extract_missing_markers(document)
-        normalization_missing_filtered = [
-            field for field in normalization_missing if field in template_placeholders
-        ]
-        all_missing_fields = sorted(set(replaced_missing + marker_missing + normalization_missing_filtered))
+        template_placeholder_set = set(template_placeholders)
+        all_missing_fields = sorted(
+            {
+                *replaced_missing,
+                *marker_missing,
+                *(field for field in normalization_missing if field in template_placeholder_set),
+            }
+        )
         _prepend_missing_information(document, all_missing_fields)
 
         output_dir = ensure_dir(Path("storage") / "projects" / str(project_id) / "generated")
@@ -120,7 +134,7 @@ def generate_draft_docx(project_id: int, template_id: int, inputs_json: str | di
         output_path = output_dir / output_name
         document.save(str(output_path))
 
-        output_sha256 = sha256_bytes(output_path.read_bytes())
+        output_sha256 = sha256_file(output_path)
 
         draft_document = Document(
             project_id=project_id,
@@ -131,20 +145,26 @@ def generate_draft_docx(project_id: int, template_id: int, inputs_json: str | di
             version=next_version,
             is_locked=False,
         )
-        session.add(draft_document)
+        # The new source and draft rows go out in one flush; a freshly created source has no pending run.
+        session.add_all([row for row in (source_document, draft_document) if row is not None])
         session.flush()
 
-        run = (
-            session.query(GenerationRun)
-            .filter(
-                GenerationRun.project_id == project_id,
-                GenerationRun.template_id == template_id,
-                GenerationRun.source_document_id == source_document_id,
-                GenerationRun.status == "pending",
+        run = None
+        if source_document is not None:
+            source_document_id = source_document.id
+            normalized_inputs["source_document_id"] = source_document_id
+        else:
+            run = (
+                session.query(GenerationRun)
+                .filter(
+                    GenerationRun.project_id == project_id,
+                    GenerationRun.template_id == template_id,
+                    GenerationRun.source_document_id == source_document_id,
+                    GenerationRun.status == "pending",
+                )
+                .order_by(GenerationRun.created_at.desc())
+                .first()
             )
-            .order_by(GenerationRun.created_at.desc())
-            .first()
-        )
 
         if run is None:
             run = GenerationRun(
@@ -152,25 +172,29 @@ def generate_draft_docx(project_id: int, template_id: int, inputs_json: str | di
                 template_id=template_id,
                 source_document_id=source_document_id,
                 status="pending",
-                inputs_json=json.dumps(normalized_inputs),
+                inputs_json=json_codec.dumps(normalized_inputs),
             )
+            # No flush: the fields below land in the single INSERT instead of a follow-up UPDATE.
             session.add(run)
-            session.flush()
 
         run.output_document_id = draft_document.id
         run.output_path = str(output_path)
         run.status = "completed"
-
+        # Read the keys before commit expires the instances and every attribute access reloads them.
+        session.flush()
+        draft_document_id = draft_document.id
+        run_id = run.id
         session.commit()
 
         return {
-            "document_id": draft_document.id,
+            "document_id": draft_document_id,
             "output_path": str(output_path),
             "missing_fields": all_missing_fields,
-            "generation_run_id": run.id,
+            "generation_run_id": run_id,
             "rendered_fields": rendered_fields_map,
             "source_document_id": source_document_id,
             "template_placeholders": template_placeholders,
         }
     finally:
-        session.close()
+        if owns_session:
+            session.close()
@@ -0,0 +1,21 @@
+import json
+from typing import Any
+
+# Optional: orjson encodes and decodes several times faster than the stdlib json module.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(value: Any, sort_keys: bool = False) -> str:
+    if orjson is None:
+        # Same output as orjson (compact separators, raw UTF-8) whichever encoder is installed.
+        return json.dumps(value, sort_keys=sort_keys, separators=(",", ":"), ensure_ascii=False)
+    return orjson.dumps(value, option=orjson.OPT_SORT_KEYS if sort_keys else 0).decode()
+
+
+def loads(data: str | bytes) -> Any:
+    if orjson is None:
+        return json.loads(data)
+    return orjson.loads(data)
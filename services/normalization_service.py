@@ -1,10 +1,12 @@
 from __future__ import annotations
 
-import json
-from collections.abc import Mapping
+from collections.abc import Callable, Mapping
 from decimal import Decimal, InvalidOperation
+from functools import partial
 from typing import Any
 
+from services import json_codec
+
 
 def format_int_commas(n: int) -> str:
     return f"{int(n):,}"
@@ -23,6 +25,20 @@ def _normalize_decimal(value: int | float | str | Decimal) -> Decimal:
     raise ValueError(f"Unsupported numeric value: {value!r}")
 
 
+# Exact fast paths: ints and floats already are the values the Decimal round trip would produce,
+# so only strings (and bools, which must keep failing) go through Decimal parsing.
+def _to_int(value: Any) -> int:
+    if type(value) is int:
+        return value
+    return int(_normalize_decimal(value))
+
+
+def _to_float(value: Any) -> float:
+    if type(value) is float:
+        return value
+    return float(_normalize_decimal(value))
+
+
 def _is_integral(value: Decimal) -> bool:
     return value == value.to_integral_value()
 
@@ -54,24 +70,29 @@ def format_percent(p: float) -> str:
 def _parse_json_like(raw_inputs_json: str | Mapping[str, Any]) -> dict[str, Any]:
     if isinstance(raw_inputs_json, Mapping):
         return dict(raw_inputs_json)
-    parsed = json.loads(raw_inputs_json)
+    parsed = json_codec.loads(raw_inputs_json)
     if not isinstance(parsed, dict):
         raise ValueError("raw_inputs_json must decode to an object")
     return parsed
 
 
-def _deep_get(data: Mapping[str, Any], path: str) -> Any:
-    current: Any = data
-    for part in path.split("."):
-        if not isinstance(current, Mapping) or part not in current:
-            return None
-        current = current[part]
-    return current
+# Every node of the payload keyed by its dotted path, built in one walk. Keys that contain a dot
+# are skipped along with everything under them: a dotted path lookup could never reach them.
+def _flatten(data: Mapping[str, Any], prefix: str = "", flat: dict[str, Any] | None = None) -> dict[str, Any]:
+    if flat is None:
+        flat = {}
+    for key, value in data.items():
+        if not isinstance(key, str) or "." in key:
+            continue
+        path = f"{prefix}{key}"
+        flat[path] = value
+        if isinstance(value, Mapping):
+            _flatten(value, f"{path}.", flat)
+    return flat
 
 
-def _deep_set(data: dict[str, Any], path: str, value: Any) -> None:
+def _deep_set(data: dict[str, Any], parts: tuple[str, ...], value: Any) -> None:
     current: dict[str, Any] = data
-    parts = path.split(".")
     for part in parts[:-1]:
         if part not in current or not isinstance(current[part], dict):
             current[part] = {}
@@ -86,82 +107,115 @@ def _render_or_missing(path: str, value: str | None, missing_fields: set[str]) -
     return value
 
 
+# Reads the flattened raw inputs, may write parsed values into normalized_inputs, returns the text.
+FieldRenderer = Callable[[Mapping[str, Any], dict[str, Any]], str | None]
+
+
+def _to_positive_int(value: Any) -> int:
+    parsed = _to_int(value)
+    if parsed <= 0:
+        raise ValueError(f"Expected a positive integer: {value!r}")
+    return parsed
+
+
+def _format_aed_2dp(amount: float) -> str:
+    return f"AED {amount:.2f}"
+
+
+def _render_issuer_name(flat: Mapping[str, Any], normalized_inputs: dict[str, Any]) -> str | None:
+    issuer_name = flat.get("issuer.name")
+    return None if issuer_name is None else str(issuer_name).strip()
+
+
+def _render_scalar_field(
+    input_path: str,
+    input_parts: tuple[str, ...],
+    parser: Callable[[Any], Any],
+    formatter: Callable[[Any], str],
+    flat: Mapping[str, Any],
+    normalized_inputs: dict[str, Any],
+) -> str | None:
+    raw_value = flat.get(input_path)
+    if raw_value is None or not str(raw_value).strip():
+        return None
+    try:
+        parsed = parser(raw_value)
+        _deep_set(normalized_inputs, input_parts, parsed)
+        return formatter(parsed)
+    except (ValueError, InvalidOperation):
+        return None
+
+
+def _scalar_renderer(
+    input_path: str,
+    parser: Callable[[Any], Any],
+    formatter: Callable[[Any], str],
+) -> FieldRenderer:
+    return partial(_render_scalar_field, input_path, tuple(input_path.split(".")), parser, formatter)
+
+
+def _render_price_range(flat: Mapping[str, Any], normalized_inputs: dict[str, Any]) -> str | None:
+    low_value = flat.get("offer.price_range_low_aed")
+    high_value = flat.get("offer.price_range_high_aed")
+    if low_value is None or high_value is None:
+        return None
+    try:
+        low = _to_float(low_value)
+        high = _to_float(high_value)
+        _deep_set(normalized_inputs, ("offer", "price_range_low_aed"), low)
+        _deep_set(normalized_inputs, ("offer", "price_range_high_aed"), high)
+        if low < high:
+            return format_price_range_aed(low, high)
+    except (ValueError, InvalidOperation):
+        pass
+    return None
+
+
+# Rendered fields in output order. Single-input fields share _render_scalar_field, which writes the
+# parsed value back to normalized_inputs at its input path; the price range needs both bounds.
+FIELD_RENDERERS: tuple[tuple[str, FieldRenderer], ...] = (
+    ("issuer.name", _render_issuer_name),
+    ("offer.offer_shares", _scalar_renderer("offer.offer_shares", _to_positive_int, format_int_commas)),
+    ("offer.price_range", _render_price_range),
+    (
+        "offer.nominal_value_per_share",
+        _scalar_renderer("offer.nominal_value_per_share_aed", _to_float, _format_aed_2dp),
+    ),
+    ("offer.percentage_offered", _scalar_renderer("offer.percentage_offered", _to_float, format_percent)),
+)
+
+# Field renderers per supported schema; normalize_inputs dispatches on schema_id with one lookup.
+SCHEMA_FIELD_RENDERERS: dict[str, tuple[tuple[str, FieldRenderer], ...]] = {
+    "talabat_v1": FIELD_RENDERERS,
+}
+
+# Rendered paths split once at import for writing the rendered map back into normalized_inputs.
+_RENDERED_PARTS: dict[str, tuple[str, ...]] = {
+    path: tuple(path.split("."))
+    for path in [*(rendered_path for rendered_path, _ in FIELD_RENDERERS), "offer.offer_shares_words", "offer.size"]
+}
+
+
 def normalize_inputs(
     schema_id: str,
     raw_inputs_json: str | Mapping[str, Any],
 ) -> tuple[dict[str, Any], dict[str, str], list[str]]:
-    if schema_id != "talabat_v1":
+    field_renderers = SCHEMA_FIELD_RENDERERS.get(schema_id)
+    if field_renderers is None:
         raise ValueError(f"Unsupported schema_id: {schema_id}")
 
     raw = _parse_json_like(raw_inputs_json)
     normalized_inputs = dict(raw)
     missing_fields: set[str] = set()
 
-    _deep_set(normalized_inputs, "offer.currency", "AED")
+    _deep_set(normalized_inputs, ("offer", "currency"), "AED")
 
+    flat = _flatten(raw)
     rendered_fields_map: dict[str, str] = {}
-
-    issuer_name = _deep_get(raw, "issuer.name")
-    issuer_text = None if issuer_name is None else str(issuer_name).strip()
-    rendered_fields_map["issuer.name"] = _render_or_missing("issuer.name", issuer_text, missing_fields)
-
-    offer_shares_value = _deep_get(raw, "offer.offer_shares")
-    offer_shares_text: str | None = None
-    if offer_shares_value is not None and str(offer_shares_value).strip():
-        try:
-            offer_shares = int(_normalize_decimal(offer_shares_value))
-            if offer_shares > 0:
-                _deep_set(normalized_inputs, "offer.offer_shares", offer_shares)
-                offer_shares_text = format_int_commas(offer_shares)
-        except (ValueError, InvalidOperation):
-            offer_shares_text = None
-    rendered_fields_map["offer.offer_shares"] = _render_or_missing(
-        "offer.offer_shares", offer_shares_text, missing_fields
-    )
-
-    low_value = _deep_get(raw, "offer.price_range_low_aed")
-    high_value = _deep_get(raw, "offer.price_range_high_aed")
-    price_range_text: str | None = None
-    if low_value is not None and high_value is not None:
-        try:
-            low = float(_normalize_decimal(low_value))
-            high = float(_normalize_decimal(high_value))
-            _deep_set(normalized_inputs, "offer.price_range_low_aed", low)
-            _deep_set(normalized_inputs, "offer.price_range_high_aed", high)
-            if low < high:
-                price_range_text = format_price_range_aed(low, high)
-        except (ValueError, InvalidOperation):
-            price_range_text = None
-
-    rendered_fields_map["offer.price_range"] = _render_or_missing(
-        "offer.price_range", price_range_text, missing_fields
-    )
-
-    nominal_value = _deep_get(raw, "offer.nominal_value_per_share_aed")
-    nominal_text: str | None = None
-    if nominal_value is not None and str(nominal_value).strip():
-        try:
-            nominal = float(_normalize_decimal(nominal_value))
-            _deep_set(normalized_inputs, "offer.nominal_value_per_share_aed", nominal)
-            nominal_text = f"AED {nominal:.2f}"
-        except (ValueError, InvalidOperation):
-            nominal_text = None
-    rendered_fields_map["offer.nominal_value_per_share"] = _render_or_missing(
-        "offer.nominal_value_per_share", nominal_text, missing_fields
-    )
-
-    percentage_value = _deep_get(raw, "offer.percentage_offered")
-    percentage_text: str | None = None
-    if percentage_value is not None and str(percentage_value).strip():
-        try:
-            percentage = float(_normalize_decimal(percentage_value))
-            _deep_set(normalized_inputs, "offer.percentage_offered", percentage)
-            percentage_text = format_percent(percentage)
-        except (ValueError, InvalidOperation):
-            percentage_text = None
-    rendered_fields_map["offer.percentage_offered"] = _render_or_missing(
-        "offer.percentage_offered", percentage_text, missing_fields
-    )
+    for rendered_path, render in field_renderers:
+        rendered_fields_map[rendered_path] = _render_or_missing(
+            rendered_path, render(flat, normalized_inputs), missing_fields
+        )
 
     rendered_fields_map["offer.offer_shares_words"] = _render_or_missing(
         "offer.offer_shares_words", None, missing_fields
@@ -171,6 +225,6 @@ def normalize_inputs(
     rendered_fields_map["offer.size"] = legacy_offer_size
 
     for key, value in rendered_fields_map.items():
-        _deep_set(normalized_inputs, key, value)
+        _deep_set(normalized_inputs, _RENDERED_PARTS[key], value)
 
     return normalized_inputs, rendered_fields_map, sorted(missing_fields)
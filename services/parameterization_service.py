@@ -1,15 +1,20 @@
-import json
 import re
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
 from pathlib import Path
 from typing import Any
 
 from docx import Document as DocxDocument
+from docx.document import Document as DocxDocumentType
 from docx.table import Table
 from docx.text.paragraph import Paragraph
 
 from db.session import SessionLocal
 from models import Template
-from services.file_service import ensure_dir, sha256_bytes
+from services import json_codec
+from services.file_cache import load_docx_copy
+from services.file_service import ensure_dir, sha256_file
 from services.prospectus_analysis_service import analyze_prospectus
 
 TARGET_FIELDS = {
@@ -39,56 +44,60 @@ class ReplacementRule:
 
 
 NOMINAL_CONTEXT_PATTERN = re.compile(r"nominal\s+value(?:\s+per\s+share)?", re.IGNORECASE)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+NUMBER_VARIANT_PATTERN = re.compile(r"^\d+(?:\.\d{1,3})?$")
 SHORT_NAME_INFERENCE_PATTERN = re.compile(
     r"\(\s*the\s+[\"'‘’]Company[\"'‘’]\s+or\s+[\"'‘’](?P<short>[A-Za-z0-9][^\"'‘’]{1,50})[\"'‘’]\s*\)",
     re.IGNORECASE,
 )
+PRICE_RANGE_SOURCE_PATTERN = re.compile(
+    r"offer\s+price\s+range\s*:\s*AED\s*([\d.]+)\s*[\-–—]\s*AED\s*([\d.]+)", re.IGNORECASE
+)
+# (field, pattern, caster) in extraction order; the price range bounds are groups 1 and 2 of one pattern.
+SOURCE_VALUE_PATTERNS: tuple[tuple[str, re.Pattern[str], type], ...] = (
+    ("issuer.name", re.compile(r"\b([A-Z][A-Za-z0-9&\-. ]+?\s+(?:plc|PJSC|LLC|L\.L\.C\.))\b"), str),
+    ("offer.offer_shares", re.compile(r"offer\s+shares\s*:\s*([\d,]+)", re.IGNORECASE), int),
+    ("offer.percentage_offered", re.compile(r"percentage\s+offered\s*:\s*([\d.]+)%", re.IGNORECASE), float),
+    (
+        "offer.nominal_value_per_share_aed",
+        re.compile(r"nominal\s+value\s+per\s+share\s*:\s*AED\s*([\d.]+)", re.IGNORECASE),
+        float,
+    ),
+    ("offer.price_range_low_aed", PRICE_RANGE_SOURCE_PATTERN, float),
+    ("offer.price_range_high_aed", PRICE_RANGE_SOURCE_PATTERN, float),
+)
+
+
+# One walk of the document tree: (container path, paragraph index, paragraph, text before any edit).
+def _collect_paragraphs(document: DocxDocument) -> list[tuple[str, int, Paragraph, str]]:
+    return [
+        (container_path, p_index, paragraph, paragraph.text)
+        for container, container_path in _iter_containers(document)
+        for p_index, paragraph in enumerate(container.paragraphs)
+    ]
 
 
-def _iter_text_blocks(document: DocxDocument) -> list[tuple[str, str]]:
+def _iter_text_blocks(paragraphs: list[tuple[str, int, Paragraph, str]]) -> list[tuple[str, str]]:
     blocks: list[tuple[str, str]] = []
-    for container, container_path in _iter_containers(document):
-        for p_index, paragraph in enumerate(container.paragraphs):
-            text = paragraph.text.strip()
-            if not text:
-                continue
-            if container_path == "document":
-                location_path = f"document/paragraphs/{p_index}"
-            else:
-                location_path = f"{container_path}/paragraphs/{p_index}"
-            blocks.append((location_path, text))
+    for container_path, p_index, _, text in paragraphs:
+        text = text.strip()
+        if not text:
+            continue
+        blocks.append((f"{container_path}/paragraphs/{p_index}", text))
     return blocks
 
 
-def extract_source_deal_values(source_docx_path: str) -> dict[str, Any]:
-    document = DocxDocument(source_docx_path)
-    blocks = _iter_text_blocks(document)
-
-    patterns: dict[str, tuple[re.Pattern[str], Any]] = {
-        "issuer.name": (re.compile(r"\b([A-Z][A-Za-z0-9&\-. ]+?\s+(?:plc|PJSC|LLC|L\.L\.C\.))\b"), str),
-        "offer.offer_shares": (re.compile(r"offer\s+shares\s*:\s*([\d,]+)", re.IGNORECASE), int),
-        "offer.percentage_offered": (
-            re.compile(r"percentage\s+offered\s*:\s*([\d.]+)%", re.IGNORECASE),
-            float,
-        ),
-        "offer.nominal_value_per_share_aed": (
-            re.compile(r"nominal\s+value\s+per\s+share\s*:\s*AED\s*([\d.]+)", re.IGNORECASE),
-            float,
-        ),
-        "offer.price_range_low_aed": (
-            re.compile(r"offer\s+price\s+range\s*:\s*AED\s*([\d.]+)\s*[\-–—]\s*AED\s*([\d.]+)", re.IGNORECASE),
-            float,
-        ),
-        "offer.price_range_high_aed": (
-            re.compile(r"offer\s+price\s+range\s*:\s*AED\s*([\d.]+)\s*[\-–—]\s*AED\s*([\d.]+)", re.IGNORECASE),
-            float,
-        ),
-    }
+def extract_source_deal_values(source_docx_path: str, document: DocxDocumentType | None = None) -> dict[str, Any]:
+    if document is None:
+        document = DocxDocument(source_docx_path)
+    return _extract_deal_values(_iter_text_blocks(_collect_paragraphs(document)))
 
+
+def _extract_deal_values(blocks: list[tuple[str, str]]) -> dict[str, Any]:
     values: dict[str, Any] = {}
     evidence: dict[str, list[dict[str, Any]]] = {}
 
-    for field, (pattern, caster) in patterns.items():
+    for field, pattern, caster in SOURCE_VALUE_PATTERNS:
         for location_path, text in blocks:
             match = pattern.search(text)
             if not match:
@@ -138,53 +147,44 @@ def _merge_dicts(base: dict[str, Any], override: dict[str, Any]) -> dict[str, An
     return result
 
 
+# Single pass: all matches are found in the original text, then each touched run is rebuilt from its
+# unmatched text plus the placeholders of matches starting in it. As before, the first overlapped run
+# takes the placeholder, inner runs are emptied and the last run keeps only the text after the match.
 def _replace_match_in_runs(paragraph: Paragraph, pattern: re.Pattern[str], replacement: str) -> int:
-    if not paragraph.runs:
+    runs = paragraph.runs
+    if not runs:
         return 0
 
-    replacements = 0
-    while True:
-        runs = paragraph.runs
-        run_ranges: list[tuple[int, int]] = []
-        cursor = 0
-        for run in runs:
-            run_text = run.text
-            run_ranges.append((cursor, cursor + len(run_text)))
-            cursor += len(run_text)
-
-        full_text = "".join(run.text for run in runs)
-        match = pattern.search(full_text)
-        if not match:
-            break
-
-        span_start, span_end = match.span()
-        overlap_indexes = [
-            i
-            for i, (start, end) in enumerate(run_ranges)
-            if start < span_end and end > span_start
-        ]
-        if not overlap_indexes:
-            break
-
-        first_index = overlap_indexes[0]
-        last_index = overlap_indexes[-1]
-        first_start, _ = run_ranges[first_index]
-        last_start, _ = run_ranges[last_index]
+    run_texts = [run.text for run in runs]
+    full_text = "".join(run_texts)
+    spans = [match.span() for match in pattern.finditer(full_text)]
+    if not spans:
+        return 0
 
-        prefix = runs[first_index].text[: max(0, span_start - first_start)]
-        suffix = runs[last_index].text[max(0, span_end - last_start) :]
+    run_ends = list(accumulate(len(run_text) for run_text in run_texts))
+    pieces: list[list[str]] = [[] for _ in runs]
+    touched: set[int] = set()
 
-        runs[first_index].text = f"{prefix}{replacement}"
-        for index in overlap_indexes[1:-1]:
-            runs[index].text = ""
-        if last_index != first_index:
-            runs[last_index].text = suffix
-        else:
-            runs[first_index].text = f"{prefix}{replacement}{suffix}"
+    def keep(start: int, end: int) -> None:
+        while start < end:
+            index = bisect_right(run_ends, start)
+            piece_end = min(end, run_ends[index])
+            pieces[index].append(full_text[start:piece_end])
+            start = piece_end
 
-        replacements += 1
+    cursor = 0
+    for span_start, span_end in spans:
+        keep(cursor, span_start)
+        first_index = bisect_right(run_ends, span_start)
+        last_index = bisect_right(run_ends, span_end - 1)
+        pieces[first_index].append(replacement)
+        touched.update(range(first_index, last_index + 1))
+        cursor = span_end
+    keep(cursor, len(full_text))
 
-    return replacements
+    for index in sorted(touched):
+        runs[index].text = "".join(pieces[index])
+    return len(spans)
 
 
 def _iter_containers(document: DocxDocument):
@@ -219,36 +219,73 @@ def _count_pattern_matches(pattern: re.Pattern[str], text: str) -> int:
     return sum(1 for _ in pattern.finditer(text))
 
 
-def _apply_rule(
-    document: DocxDocument,
-    rule: ReplacementRule,
+# A location is allowed when it, or any of its "/"-separated ancestors, is an allowed block:
+# one set lookup per path segment instead of a prefix scan over every allowed path.
+def _is_allowed_location(location_path: str, allowed_paths: set[str]) -> bool:
+    candidate = location_path
+    while True:
+        if candidate in allowed_paths:
+            return True
+        if "/" not in candidate:
+            return False
+        candidate = candidate.rsplit("/", 1)[0]
+
+
+# One alternation of every rule pattern, each keeping its own flags: a paragraph it does not match
+# cannot match any single rule, so one scan rules it out instead of one scan per pattern.
+def _build_prefilter(rules: list[ReplacementRule]) -> re.Pattern[str] | None:
+    alternatives = [
+        f"(?i:{pattern.pattern})" if pattern.flags & re.IGNORECASE else f"(?:{pattern.pattern})"
+        for rule in rules
+        for pattern in rule.patterns
+    ]
+    if not alternatives:
+        return None
+    return _compile("|".join(alternatives))
+
+
+# One traversal for all rules: each paragraph sees the rules in order, exactly as if every rule had
+# walked the whole document in turn, since a rule's edits never reach outside the paragraph it matched.
+def _apply_rules(
+    paragraphs: list[tuple[str, int, Paragraph, str]],
+    rules: list[ReplacementRule],
     allowed_paths: set[str],
-) -> dict[str, Any]:
-    report = {
-        "field": rule.field,
-        "placeholder": rule.placeholder,
-        "found_count": 0,
-        "replaced_count": 0,
-        "skipped_count": 0,
-        "sample_locations": [],
-    }
+) -> list[dict[str, Any]]:
+    reports = [
+        {
+            "field": rule.field,
+            "placeholder": rule.placeholder,
+            "found_count": 0,
+            "replaced_count": 0,
+            "skipped_count": 0,
+            "sample_locations": [],
+        }
+        for rule in rules
+    ]
+    prefilter = _build_prefilter(rules)
+    # Merged table cells and linked headers yield the same paragraph more than once; once edited,
+    # its collected text is stale and later visits read it afresh.
+    edited: set[Any] = set()
     block_counter = 0
-    for container, container_path in _iter_containers(document):
-        for p_index, paragraph in enumerate(container.paragraphs):
-            if container_path == "document":
-                location_path = f"document/paragraphs/{p_index}"
-            else:
-                location_path = f"{container_path}/paragraphs/{p_index}"
-
-            if rule.requires_context and not rule.requires_context.search(paragraph.text):
-                block_counter += 1
+    for container_path, p_index, paragraph, text in paragraphs:
+        if paragraph._p in edited:  # noqa: SLF001
+            text = paragraph.text
+        if prefilter is None or not prefilter.search(text):
+            block_counter += 1
+            continue
+        # Most paragraphs match no rule, so their location string is only built on a first match.
+        location_path: str | None = None
+        is_allowed: bool | None = None
+        for rule, report in zip(rules, reports):
+            if rule.requires_context and not rule.requires_context.search(text):
                 continue
 
-            found_here = sum(_count_pattern_matches(pattern, paragraph.text) for pattern in rule.patterns)
+            found_here = sum(_count_pattern_matches(pattern, text) for pattern in rule.patterns)
             if found_here == 0:
-                block_counter += 1
                 continue
 
+            if location_path is None:
+                location_path = f"{container_path}/paragraphs/{p_index}"
             report["found_count"] += found_here
             if len(report["sample_locations"]) < 5:
                 report["sample_locations"].append(
@@ -256,25 +293,31 @@ def _apply_rule(
                 )
 
             if allowed_paths:
-                is_allowed = any(
-                    location_path == allowed or location_path.startswith(f"{allowed}/")
-                    for allowed in allowed_paths
-                )
+                if is_allowed is None:
+                    is_allowed = _is_allowed_location(location_path, allowed_paths)
                 if not is_allowed:
                     report["skipped_count"] += found_here
-                    block_counter += 1
                     continue
 
             total_here = 0
             for pattern in rule.patterns:
                 total_here += _replace_match_in_runs(paragraph, pattern, rule.placeholder)
             report["replaced_count"] += total_here
-            block_counter += 1
-    return report
+            if total_here:
+                text = paragraph.text
+                edited.add(paragraph._p)  # noqa: SLF001
+        block_counter += 1
+    return reports
+
+
+# Rule patterns depend only on the deal inputs, so repeated runs with the same values reuse the compiled regex.
+@lru_cache(maxsize=512)
+def _compile(pattern: str, flags: int = 0) -> re.Pattern[str]:
+    return re.compile(pattern, flags)
 
 
 def _normalize_whitespace(text: str) -> str:
-    return re.sub(r"\s+", " ", text).strip()
+    return WHITESPACE_PATTERN.sub(" ", text).strip()
 
 
 def _number_variants(value: float) -> list[str]:
@@ -286,25 +329,25 @@ def _number_variants(value: float) -> list[str]:
         f"{rounded:.2f}",
         f"{rounded:.3f}",
     }
-    return sorted({v for v in variants if re.match(r"^\d+(?:\.\d{1,3})?$", v)})
+    return sorted({v for v in variants if NUMBER_VARIANT_PATTERN.match(v)})
 
 
+@lru_cache(maxsize=128)
 def _build_number_pattern(value: float) -> str:
     return "(?:" + "|".join(re.escape(v) for v in _number_variants(value)) + ")"
 
 
-def _infer_issuer_short_name(document: DocxDocument) -> str | None:
-    for container, _ in _iter_containers(document):
-        for paragraph in container.paragraphs:
-            match = SHORT_NAME_INFERENCE_PATTERN.search(paragraph.text)
-            if match:
-                short_name = _normalize_whitespace(match.group("short"))
-                if short_name and short_name.lower() != "company":
-                    return short_name
+def _infer_issuer_short_name(paragraphs: list[tuple[str, int, Paragraph, str]]) -> str | None:
+    for _, _, _, text in paragraphs:
+        match = SHORT_NAME_INFERENCE_PATTERN.search(text)
+        if match:
+            short_name = _normalize_whitespace(match.group("short"))
+            if short_name and short_name.lower() != "company":
+                return short_name
     return None
 
 
-def _build_rules(document: DocxDocument, inputs: dict[str, Any]) -> list[ReplacementRule]:
+def _build_rules(paragraphs: list[tuple[str, int, Paragraph, str]], inputs: dict[str, Any]) -> list[ReplacementRule]:
     issuer_name = str(inputs.get("issuer", {}).get("name") or "").strip()
     issuer_short_name = str(inputs.get("issuer", {}).get("short_name") or "").strip()
     offer = inputs.get("offer", {})
@@ -313,26 +356,26 @@ def _build_rules(document: DocxDocument, inputs: dict[str, Any]) -> list[Replace
 
     if issuer_name:
         normalized_issuer = _normalize_whitespace(issuer_name)
-        issuer_pattern = re.sub(r"\s+", r"\\s+", re.escape(normalized_issuer))
+        issuer_pattern = WHITESPACE_PATTERN.sub(r"\\s+", re.escape(normalized_issuer))
         rules.append(
             ReplacementRule(
                 field="issuer.name",
                 placeholder=TARGET_FIELDS["issuer.name"],
                 patterns=[
-                    re.compile(re.escape(issuer_name)),
-                    re.compile(issuer_pattern, re.IGNORECASE),
+                    _compile(re.escape(issuer_name)),
+                    _compile(issuer_pattern, re.IGNORECASE),
                 ],
             )
         )
 
-    inferred_short_name = _infer_issuer_short_name(document)
+    inferred_short_name = _infer_issuer_short_name(paragraphs)
     short_name = issuer_short_name or inferred_short_name
     if short_name:
         rules.append(
             ReplacementRule(
                 field="issuer.short_name",
                 placeholder=TARGET_FIELDS["issuer.short_name"],
-                patterns=[re.compile(rf"\b{re.escape(short_name)}\b", re.IGNORECASE)],
+                patterns=[_compile(rf"\b{re.escape(short_name)}\b", re.IGNORECASE)],
             )
         )
 
@@ -343,7 +386,7 @@ def _build_rules(document: DocxDocument, inputs: dict[str, Any]) -> list[Replace
             ReplacementRule(
                 field="offer.offer_shares",
                 placeholder=TARGET_FIELDS["offer.offer_shares"],
-                patterns=[re.compile(re.escape(formatted))],
+                patterns=[_compile(re.escape(formatted))],
             )
         )
 
@@ -354,7 +397,7 @@ def _build_rules(document: DocxDocument, inputs: dict[str, Any]) -> list[Replace
             ReplacementRule(
                 field="offer.percentage_offered",
                 placeholder=TARGET_FIELDS["offer.percentage_offered"],
-                patterns=[re.compile(re.escape(percent_text))],
+                patterns=[_compile(re.escape(percent_text))],
             )
         )
 
@@ -365,7 +408,7 @@ def _build_rules(document: DocxDocument, inputs: dict[str, Any]) -> list[Replace
             ReplacementRule(
                 field="offer.nominal_value_per_share",
                 placeholder=TARGET_FIELDS["offer.nominal_value_per_share"],
-                patterns=[re.compile(rf"\bAED\s*{nominal_number_pattern}\b", re.IGNORECASE)],
+                patterns=[_compile(rf"\bAED\s*{nominal_number_pattern}\b", re.IGNORECASE)],
                 requires_context=NOMINAL_CONTEXT_PATTERN,
             )
         )
@@ -380,7 +423,7 @@ def _build_rules(document: DocxDocument, inputs: dict[str, Any]) -> list[Replace
                 field="offer.price_range",
                 placeholder=TARGET_FIELDS["offer.price_range"],
                 patterns=[
-                    re.compile(
+                    _compile(
                         rf"\bAED\s*{low_pattern}\s*(?:[\-–—]\s*(?:AED\s*)?|to\s+(?:AED\s*)?){high_pattern}\b",
                         re.IGNORECASE,
                     )
@@ -391,14 +434,14 @@ def _build_rules(document: DocxDocument, inputs: dict[str, Any]) -> list[Replace
             ReplacementRule(
                 field="offer.price_range_low",
                 placeholder=TARGET_FIELDS["offer.price_range_low"],
-                patterns=[re.compile(rf"\bAED\s*{low_pattern}\b", re.IGNORECASE)],
+                patterns=[_compile(rf"\bAED\s*{low_pattern}\b", re.IGNORECASE)],
             )
         )
         rules.append(
             ReplacementRule(
                 field="offer.price_range_high",
                 placeholder=TARGET_FIELDS["offer.price_range_high"],
-                patterns=[re.compile(rf"\bAED\s*{high_pattern}\b", re.IGNORECASE)],
+                patterns=[_compile(rf"\bAED\s*{high_pattern}\b", re.IGNORECASE)],
             )
         )
 
@@ -446,8 +489,14 @@ def parameterize_template_from_source(
     project_id: int,
     aliases: dict[str, list[str]] | None = None,
     dry_run: bool = False,
+    document: DocxDocumentType | None = None,
 ) -> dict[str, Any]:
-    extracted = extract_source_deal_values(source_docx_path)
+    # Parse once: extraction and analysis only read the document, and the rules below edit it in place.
+    # A caller-supplied document is therefore modified too.
+    if document is None:
+        document = load_docx_copy(source_docx_path)
+    paragraphs = _collect_paragraphs(document)
+    extracted = _extract_deal_values(_iter_text_blocks(paragraphs))
     merged_inputs = _merge_dicts(_nested_payload(extracted["values"]), inputs)
 
     _ = aliases
@@ -455,6 +504,7 @@ def parameterize_template_from_source(
         source_docx_path,
         issuer_name=str(merged_inputs.get("issuer", {}).get("name") or "").strip() or None,
         offer_shares=merged_inputs.get("offer", {}).get("offer_shares"),
+        document=document,
     )
     allowed_paths = {
         block["location_path"]
@@ -462,12 +512,10 @@ def parameterize_template_from_source(
         if block["classification"] in {"deal_specific", "mixed"}
     }
 
-    document = DocxDocument(source_docx_path)
-    rules = _build_rules(document, merged_inputs)
+    rules = _build_rules(paragraphs, merged_inputs)
     field_reports = {field: {"found_count": 0, "replaced_count": 0, "skipped_count": 0, "sample_locations": []} for field in TARGET_FIELDS}
 
-    for rule in rules:
-        rule_report = _apply_rule(document, rule, allowed_paths)
+    for rule, rule_report in zip(rules, _apply_rules(paragraphs, rules, allowed_paths)):
         field_reports[rule.field] = {
             "found_count": rule_report["found_count"],
             "replaced_count": rule_report["replaced_count"],
@@ -527,7 +575,6 @@ def parameterize_template_from_source(
         output_path = output_dir / output_name
 
         document.save(str(output_path))
-        file_bytes = output_path.read_bytes()
 
         metadata = {
             "source_template_id": base_template_id,
@@ -541,10 +588,10 @@ def parameterize_template_from_source(
         template = Template(
             name=parameterized_name,
             status="draft",
-            sha256=sha256_bytes(file_bytes),
+            sha256=sha256_file(output_path),
             file_path=str(output_path),
             version=next_version,
-            metadata_json=json.dumps(metadata),
+            metadata_json=json_codec.dumps(metadata),
         )
         session.add(template)
         session.commit()
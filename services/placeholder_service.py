@@ -1,13 +1,22 @@
 import re
-from collections.abc import Mapping
-
+import zipfile
+from bisect import bisect_right
+from collections.abc import Callable, Mapping
+from functools import lru_cache, partial
+from itertools import accumulate
+from pathlib import Path
+
+from docx.blkcntnr import BlockItemContainer
 from docx.document import Document as DocxDocumentType
+from docx.oxml import parse_xml
 from docx.table import _Cell, Table
 from docx.text.paragraph import Paragraph
 
 PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*([a-zA-Z0-9_.]+)\s*\}\}")
 MISSING_MARKER_PATTERN = re.compile(r"\[\[MISSING:\s*([^\]]+)\]\]")
 
+DOCX_BODY_PART = "word/document.xml"
+
 
 def _resolve_path(data: Mapping[str, object], path: str) -> str:
     current: object = data
@@ -23,99 +32,109 @@ def _resolve_path(data: Mapping[str, object], path: str) -> str:
     return text if text else f"[[MISSING: {path}]]"
 
 
-def _replace_in_runs(paragraph: Paragraph, inputs: Mapping[str, object], missing_fields: set[str]) -> None:
-    if not paragraph.runs:
+# One scan of the joined run text per paragraph: every match is spliced into the runs it overlaps
+# (replacement into the first, the rest of the match cleared) and each touched run is written once.
+def _replace_in_runs(paragraph: Paragraph, resolve: Callable[[str], str], missing_fields: set[str]) -> None:
+    runs = paragraph.runs
+    if not runs:
         return
 
-    while True:
-        runs = paragraph.runs
-        run_ranges: list[tuple[int, int]] = []
-        cursor = 0
-        for run in runs:
-            run_text = run.text
-            run_ranges.append((cursor, cursor + len(run_text)))
-            cursor += len(run_text)
+    run_texts = [run.text for run in runs]
+    full_text = "".join(run_texts)
+    if "{{" not in full_text:
+        return
 
-        full_text = "".join(run.text for run in runs)
-        match = PLACEHOLDER_PATTERN.search(full_text)
-        if not match:
-            return
+    run_ends = list(accumulate(len(run_text) for run_text in run_texts))
+    pieces: list[list[str]] = [[] for _ in runs]
+    touched: set[int] = set()
 
+    def keep(start: int, end: int) -> None:
+        while start < end:
+            index = bisect_right(run_ends, start)
+            piece_end = min(end, run_ends[index])
+            pieces[index].append(full_text[start:piece_end])
+            start = piece_end
+
+    cursor = 0
+    for match in PLACEHOLDER_PATTERN.finditer(full_text):
         field_path = match.group(1)
-        replacement = _resolve_path(inputs, field_path)
+        replacement = resolve(field_path)
         if replacement.startswith("[[MISSING:"):
             missing_fields.add(field_path)
 
         span_start, span_end = match.span()
-        overlap_indexes = [
-            i
-            for i, (start, end) in enumerate(run_ranges)
-            if start < span_end and end > span_start
-        ]
-
-        if not overlap_indexes:
-            return
+        keep(cursor, span_start)
+        first_index = bisect_right(run_ends, span_start)
+        last_index = bisect_right(run_ends, span_end - 1)
+        pieces[first_index].append(replacement)
+        touched.update(range(first_index, last_index + 1))
+        cursor = span_end
+    keep(cursor, len(full_text))
 
-        first_index = overlap_indexes[0]
-        last_index = overlap_indexes[-1]
-        first_start, _ = run_ranges[first_index]
-        last_start, _ = run_ranges[last_index]
+    for index in sorted(touched):
+        runs[index].text = "".join(pieces[index])
 
-        prefix = runs[first_index].text[: max(0, span_start - first_start)]
-        suffix = runs[last_index].text[max(0, span_end - last_start) :]
 
-        runs[first_index].text = f"{prefix}{replacement}"
-        for index in overlap_indexes[1:-1]:
-            runs[index].text = ""
-        if last_index != first_index:
-            runs[last_index].text = suffix
-        else:
-            runs[first_index].text = f"{prefix}{replacement}{suffix}"
-
-
-def _replace_in_table(table: Table, inputs: Mapping[str, object], missing_fields: set[str]) -> None:
+def _replace_in_table(table: Table, resolve: Callable[[str], str], missing_fields: set[str]) -> None:
     for row in table.rows:
         for cell in row.cells:
-            _replace_in_container(cell, inputs, missing_fields)
+            _replace_in_container(cell, resolve, missing_fields)
 
 
 def _replace_in_container(
     container: DocxDocumentType | _Cell,
-    inputs: Mapping[str, object],
+    resolve: Callable[[str], str],
     missing_fields: set[str],
 ) -> None:
     for paragraph in container.paragraphs:
-        _replace_in_runs(paragraph, inputs, missing_fields)
+        _replace_in_runs(paragraph, resolve, missing_fields)
 
     for table in container.tables:
-        _replace_in_table(table, inputs, missing_fields)
+        _replace_in_table(table, resolve, missing_fields)
 
 
 def replace_placeholders_in_docx(document: DocxDocumentType, inputs: Mapping[str, object]) -> list[str]:
     missing_fields: set[str] = set()
-    _replace_in_container(document, inputs, missing_fields)
+    # Templates repeat the same placeholders; each path is resolved once per document pass.
+    resolve = lru_cache(maxsize=None)(partial(_resolve_path, inputs))
+    _replace_in_container(document, resolve, missing_fields)
     return sorted(missing_fields)
 
 
-def extract_missing_markers(document: DocxDocumentType) -> list[str]:
+def _document_text_chunks(document: DocxDocumentType | BlockItemContainer) -> list[str]:
     text_chunks: list[str] = [paragraph.text for paragraph in document.paragraphs]
     for table in document.tables:
         for row in table.rows:
             for cell in row.cells:
                 text_chunks.extend(paragraph.text for paragraph in cell.paragraphs)
+    return text_chunks
 
+
+# Every match contains its opening literal inside a single chunk, so documents without it skip the
+# join and the regex. Otherwise chunks are still joined: \s* and [^\]] may cross the newlines.
+def _scan_text_chunks(text_chunks: list[str], opening: str, pattern: re.Pattern[str]) -> list[str]:
+    if not any(opening in chunk for chunk in text_chunks):
+        return []
     text = "\n".join(text_chunks)
-    found = {match.group(1).strip() for match in MISSING_MARKER_PATTERN.finditer(text)}
-    return sorted(found)
+    return sorted({match.group(1).strip() for match in pattern.finditer(text)})
+
+
+def extract_missing_markers(document: DocxDocumentType) -> list[str]:
+    return _scan_text_chunks(_document_text_chunks(document), "[[MISSING:", MISSING_MARKER_PATTERN)
 
 
 def extract_placeholders_from_docx(document: DocxDocumentType) -> list[str]:
-    text_chunks: list[str] = [paragraph.text for paragraph in document.paragraphs]
-    for table in document.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                text_chunks.extend(paragraph.text for paragraph in cell.paragraphs)
+    return _scan_text_chunks(_document_text_chunks(document), "{{", PLACEHOLDER_PATTERN)
 
-    text = "\n".join(text_chunks)
-    found = {match.group(1).strip() for match in PLACEHOLDER_PATTERN.finditer(text)}
-    return sorted(found)
+
+# Same scope as extract_placeholders_from_docx and replace_placeholders_in_docx: only the main
+# document part is parsed, then read through python-docx's paragraph and table wrappers, so content
+# controls and text boxes (which replacement never reaches) are skipped and w:br/w:tab read as text.
+def extract_placeholders_from_docx_path(path: str | Path) -> list[str]:
+    with zipfile.ZipFile(path) as archive:
+        xml = archive.read(DOCX_BODY_PART)
+    if b"{" not in xml:
+        return []
+
+    body = BlockItemContainer(parse_xml(xml).body, None)
+    return _scan_text_chunks(_document_text_chunks(body), "{{", PLACEHOLDER_PATTERN)
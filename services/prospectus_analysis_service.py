@@ -5,6 +5,7 @@ from pathlib import Path
 from typing import Any
 
 from docx import Document as DocxDocument
+from docx.document import Document as DocxDocumentType
 
 from db.session import SessionLocal
 from models import Document, ProspectusAnalysis
@@ -131,12 +132,14 @@ def analyze_prospectus(
     source_docx_path: str,
     issuer_name: str | None = None,
     offer_shares: int | None = None,
+    document: DocxDocumentType | None = None,
 ) -> dict[str, Any]:
     path = Path(source_docx_path)
-    if not path.exists():
-        raise FileNotFoundError(f"Source DOCX not found: {source_docx_path}")
+    if document is None:
+        if not path.exists():
+            raise FileNotFoundError(f"Source DOCX not found: {source_docx_path}")
+        document = DocxDocument(str(path))
 
-    document = DocxDocument(str(path))
     blocks: list[dict[str, Any]] = []
     counts = {"boilerplate": 0, "deal_specific": 0, "mixed": 0}
 
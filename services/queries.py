@@ -0,0 +1,144 @@
+from typing import Any
+
+import pandas as pd
+import streamlit as st
+from sqlalchemy import select
+
+from db.session import SessionLocal
+from models import Document, ProspectusProject, Template
+
+# Loaders return plain dicts: detached ORM instances neither pickle into st.cache_data nor
+# survive the session closing. Call the matching .clear() after committing a mutation.
+# Only the listed columns are selected, so no ORM instances are hydrated for listing views.
+
+DOCUMENT_TABLE_COLUMNS = {
+    "id": "ID",
+    "doc_type": "Type",
+    "version": "Version",
+    "file_name": "File",
+    "sha256": "SHA256",
+    "is_locked": "Locked",
+    "created_at": "Created At",
+}
+TEMPLATE_PAGE_SIZE = 25
+TEMPLATE_TABLE_COLUMNS = {
+    "id": "ID",
+    "name": "Name",
+    "status": "Status",
+    "version": "Version",
+    "sha256": "SHA256",
+    "file_path": "Path",
+    "created_at": "Created At",
+}
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def list_projects() -> list[dict[str, Any]]:
+    session = SessionLocal()
+    try:
+        rows = session.execute(
+            select(
+                ProspectusProject.id,
+                ProspectusProject.name,
+                ProspectusProject.locked_final,
+                ProspectusProject.created_at,
+            ).order_by(ProspectusProject.created_at.desc())
+        ).all()
+        return [dict(row._mapping) for row in rows]
+    finally:
+        session.close()
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def list_documents(project_id: int) -> list[dict[str, Any]]:
+    session = SessionLocal()
+    try:
+        rows = session.execute(
+            select(
+                Document.id,
+                Document.project_id,
+                Document.doc_type,
+                Document.version,
+                Document.file_name,
+                Document.file_path,
+                Document.sha256,
+                Document.is_locked,
+                Document.created_at,
+            )
+            .where(Document.project_id == project_id)
+            .order_by(Document.created_at.desc())
+        ).all()
+        return [dict(row._mapping) for row in rows]
+    finally:
+        session.close()
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def list_templates() -> list[dict[str, Any]]:
+    session = SessionLocal()
+    try:
+        rows = session.execute(
+            select(
+                Template.id,
+                Template.name,
+                Template.status,
+                Template.version,
+                Template.sha256,
+                Template.file_path,
+                Template.created_at,
+            ).order_by(Template.created_at.desc())
+        ).all()
+        return [dict(row._mapping) for row in rows]
+    finally:
+        session.close()
+
+
+# Keyset page of the library, newest first: only templates with id < before_id (None = newest).
+# One extra row is fetched to tell whether an older page exists without a separate COUNT.
+@st.cache_data(ttl=60, show_spinner=False)
+def list_templates_page(
+    before_id: int | None = None,
+    limit: int = TEMPLATE_PAGE_SIZE,
+) -> tuple[list[dict[str, Any]], bool]:
+    session = SessionLocal()
+    try:
+        statement = select(
+            Template.id,
+            Template.name,
+            Template.status,
+            Template.version,
+            Template.sha256,
+            Template.file_path,
+            Template.created_at,
+        ).order_by(Template.id.desc())
+        if before_id is not None:
+            statement = statement.where(Template.id < before_id)
+        rows = session.execute(statement.limit(limit + 1)).all()
+        return [dict(row._mapping) for row in rows[:limit]], len(rows) > limit
+    finally:
+        session.close()
+
+
+# Display frames are built once per data change rather than converted from dicts on every rerun.
+@st.cache_data(ttl=60, show_spinner=False)
+def documents_table(project_id: int) -> pd.DataFrame:
+    frame = pd.DataFrame.from_records(list_documents(project_id), columns=list(DOCUMENT_TABLE_COLUMNS))
+    return frame.rename(columns=DOCUMENT_TABLE_COLUMNS)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def templates_table(before_id: int | None = None) -> pd.DataFrame:
+    templates, _ = list_templates_page(before_id)
+    frame = pd.DataFrame.from_records(templates, columns=list(TEMPLATE_TABLE_COLUMNS))
+    return frame.rename(columns=TEMPLATE_TABLE_COLUMNS)
+
+
+def invalidate_documents() -> None:
+    list_documents.clear()
+    documents_table.clear()
+
+
+def invalidate_templates() -> None:
+    list_templates.clear()
+    list_templates_page.clear()
+    templates_table.clear()
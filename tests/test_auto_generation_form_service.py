@@ -3,9 +3,11 @@ import pytest
 pytest.importorskip("docx")
 
 from services.auto_generation_form_service import (
+    build_raw_inputs_payload,
     build_template_form_spec,
     find_unresolved_template_placeholders,
     load_schema,
+    validate_required_paths,
 )
 
 
@@ -39,3 +41,60 @@ def test_find_unresolved_template_placeholders_only_reports_selected_template_fi
     unresolved = find_unresolved_template_placeholders(placeholders, rendered)
 
     assert unresolved == ["issuer.country", "offer.offer_shares"]
+
+
+def test_validate_required_paths_falls_back_to_raw_payload():
+    raw_payload = {
+        "issuer": {"name": "  "},
+        "offer": {"offer_shares": 1000, "price_range_low_aed": None},
+    }
+    rendered = {
+        "issuer.name": "[[MISSING: issuer.name]]",
+        "offer.price_range_high_aed": "AED 2.00",
+    }
+
+    errors = validate_required_paths(
+        ["issuer.name", "offer.offer_shares", "offer.price_range_low_aed", "offer.price_range_high_aed", "key_dates"],
+        raw_payload,
+        rendered,
+    )
+
+    assert errors == [
+        "issuer.name is required.",
+        "offer.price_range_low_aed is required.",
+        "key_dates is required.",
+    ]
+
+
+def test_build_raw_inputs_payload_nests_dotted_fields():
+    payload = build_raw_inputs_payload(
+        schema_id="talabat_v1",
+        project_id=1,
+        template_id=2,
+        source_document_id=None,
+        use_template_as_source=True,
+        field_values={"issuer.name": "Acme Holdings", "risk_factors": "Market risk\n\n Liquidity risk "},
+    )
+
+    assert payload["issuer"] == {"name": "Acme Holdings"}
+    assert payload["offer"]["currency"] == "AED"
+    assert payload["offer"]["offer_shares"] is None
+    assert payload["tranche_1"] == {"min_subscription_aed": None, "increment_aed": None}
+    assert payload["risk_factors"] == ["Market risk", "Liquidity risk"]
+
+
+def test_build_template_form_spec_accepts_unindexed_schema():
+    schema = {
+        "schema_id": "talabat_v1",
+        "fields": [
+            {"path": "issuer.name", "required": True},
+            {"path": "key_dates", "required": False},
+        ],
+    }
+
+    form_spec = build_template_form_spec(["key_dates", "issuer.name"], schema)
+
+    assert [field["path"] for field in form_spec["fields"]] == ["issuer.name", "key_dates"]
+    assert form_spec["required_paths"] == ["issuer.name"]
+    assert "_fields_by_path" not in schema
+    assert "_fields_by_path" in load_schema()
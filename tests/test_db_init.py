@@ -22,6 +22,10 @@ def test_init_db_creates_tables(tmp_path, monkeypatch):
     init_db_module.init_db()
     init_db_module.init_db()
 
+    with session_module.engine.connect() as connection:
+        user_version = connection.execute(sqlalchemy.text("PRAGMA user_version")).scalar()
+    assert user_version == init_db_module.SCHEMA_VERSION
+
     inspector = inspect(session_module.engine)
     table_names = set(inspector.get_table_names())
 
@@ -36,4 +40,66 @@ def test_init_db_creates_tables(tmp_path, monkeypatch):
         "audit_logs",
     }
     assert expected_tables.issubset(table_names)
+
+    document_indexes = {index["name"] for index in inspector.get_indexes("documents")}
+    assert {
+        "ix_documents_project_created",
+        "ix_documents_project_doctype_created",
+        "ix_documents_project_doctype_version",
+    }.issubset(document_indexes)
+    assert "ix_documents_project_doctype" not in document_indexes
+    template_indexes = {index["name"] for index in inspector.get_indexes("templates")}
+    assert "ix_templates_created" in template_indexes
     assert os.path.exists(db_file)
+
+
+def test_init_db_migrates_legacy_schema(tmp_path, monkeypatch):
+    db_file = tmp_path / "test_legacy.db"
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db_file}")
+
+    for module_name in ("models.entities", "db.init_db", "db.session"):
+        sys.modules.pop(module_name, None)
+
+    import importlib
+
+    session_module = importlib.import_module("db.session")
+    with session_module.engine.begin() as connection:
+        connection.execute(
+            sqlalchemy.text(
+                "CREATE TABLE templates (id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, "
+                "status VARCHAR(50) NOT NULL, version INTEGER NOT NULL, sha256 VARCHAR(64) NOT NULL, "
+                "file_path VARCHAR(500) NOT NULL, created_at DATETIME NOT NULL)"
+            )
+        )
+
+    init_db_module = importlib.import_module("db.init_db")
+    init_db_module.init_db()
+    init_db_module.init_db()
+
+    inspector = inspect(session_module.engine)
+    assert "metadata_json" in {column["name"] for column in inspector.get_columns("templates")}
+    assert "deal_profiles" in set(inspector.get_table_names())
+
+
+def test_create_deal_profiles_table_runs_ddl_batch(tmp_path, monkeypatch):
+    db_file = tmp_path / "test_deal_profiles.db"
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db_file}")
+
+    for module_name in ("models.entities", "db.init_db", "db.session"):
+        sys.modules.pop(module_name, None)
+
+    import importlib
+
+    session_module = importlib.import_module("db.session")
+    init_db_module = importlib.import_module("db.init_db")
+
+    with session_module.engine.begin() as connection:
+        init_db_module._create_deal_profiles_table(connection)
+
+    inspector = inspect(session_module.engine)
+    assert "deal_profiles" in set(inspector.get_table_names())
+    assert {
+        "ix_deal_profiles_project_id",
+        "ix_deal_profiles_template_id",
+        "ix_deal_profiles_schema_id",
+    }.issubset({index["name"] for index in inspector.get_indexes("deal_profiles")})
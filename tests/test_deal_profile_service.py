@@ -59,6 +59,8 @@ def test_save_and_get_latest_profile(tmp_path, monkeypatch):
         latest = deal_profile_service.get_latest_profile(project.id, "talabat_v1", template.id)
 
         assert first.id != second.id
+        assert second.created_at is not None
+        assert json.loads(second.inputs_normalized_json) == {"issuer": {"name": "Issuer B"}}
         assert latest is not None
         assert latest.id == second.id
         assert json.loads(latest.inputs_raw_json)["issuer"]["name"] == "Issuer B"
@@ -84,3 +84,45 @@ def test_project_docx_query_returns_same_project_docs_only(tmp_path, monkeypatch
         assert project_one_docs[0].file_name == "project_one_source.docx"
     finally:
         session.close()
+
+
+def test_extract_preview_and_outline_from_docx(tmp_path, monkeypatch):
+    docx = pytest.importorskip("docx")
+    _, _, document_service = _init_test_modules(monkeypatch, tmp_path / "test_preview.db")
+
+    source_path = tmp_path / "source.docx"
+    document = docx.Document()
+    document.add_paragraph("IMPORTANT NOTICE")
+    document.add_paragraph("1. Offer Summary")
+    document.add_paragraph("1.2 Offer Shares")
+    document.add_paragraph("The offer comprises ordinary shares.")
+    document.save(str(source_path))
+
+    result = document_service.extract_preview_and_outline(source_path, preview_chars=16)
+
+    assert result["preview"] == "IMPORTANT NOTICE"
+    assert result["outline"] == [
+        {"title": "IMPORTANT NOTICE", "level": 1},
+        {"title": "1. Offer Summary", "level": 1},
+        {"title": "1.2 Offer Shares", "level": 2},
+    ]
+
+
+def test_detect_outline_keeps_caps_precedence_over_numbering(tmp_path, monkeypatch):
+    _, _, document_service = _init_test_modules(monkeypatch, tmp_path / "test_outline.db")
+
+    text = (
+        "1.2 OFFER SHARES\n"
+        "  3.1.4) Lock-up arrangements  \n"
+        "2024 was a record year for the Company.\n"
+        "The offer comprises ordinary shares.\n"
+        "\n"
+        "RISK"
+    )
+
+    assert document_service.detect_outline(text) == [
+        {"title": "1.2 OFFER SHARES", "level": 1},
+        {"title": "3.1.4) Lock-up arrangements", "level": 3},
+        {"title": "2024 was a record year for the Company.", "level": 1},
+        {"title": "RISK", "level": 1},
+    ]
@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("streamlit")
+
+from services.file_cache import (
+    cached_preview_and_outline,
+    file_bytes_loader,
+    load_docx_copy,
+    read_file_bytes,
+)
+
+
+def test_file_bytes_loader_is_lazy_and_keyed_by_sha256(tmp_path):
+    read_file_bytes.clear()
+    target = tmp_path / "doc.docx"
+
+    loader = file_bytes_loader(target, "a" * 64)
+    target.write_bytes(b"first")
+    assert loader() == b"first"
+
+    target.write_bytes(b"second")
+    assert loader() == b"first"
+    assert file_bytes_loader(target, "b" * 64)() == b"second"
+
+
+def test_cached_preview_and_outline_is_keyed_by_preview_length(tmp_path):
+    docx = pytest.importorskip("docx")
+    cached_preview_and_outline.clear()
+    source_path = tmp_path / "source.docx"
+    document = docx.Document()
+    document.add_paragraph("IMPORTANT NOTICE")
+    document.add_paragraph("1. Offer Summary")
+    document.save(str(source_path))
+
+    short = cached_preview_and_outline(str(source_path), "c" * 64, 9)
+    full = cached_preview_and_outline(str(source_path), "c" * 64)
+
+    assert short["preview"] == "IMPORTANT"
+    assert full["preview"] == "IMPORTANT NOTICE\n1. Offer Summary"
+    assert full["outline_pretty_json"].startswith("[\n  {")
+
+
+def test_load_docx_copy_returns_independent_copies_and_sees_rewrites(tmp_path):
+    docx = pytest.importorskip("docx")
+    template_path = tmp_path / "template.docx"
+    document = docx.Document()
+    document.add_paragraph("Issuer: {{issuer.name}}")
+    document.save(str(template_path))
+
+    first = load_docx_copy(template_path)
+    first.paragraphs[0].runs[0].text = "edited"
+    assert load_docx_copy(template_path).paragraphs[0].text == "Issuer: {{issuer.name}}"
+
+    document.add_paragraph("Offer Shares: {{offer.offer_shares}}")
+    document.save(str(template_path))
+    assert [p.text for p in load_docx_copy(template_path).paragraphs][-1] == "Offer Shares: {{offer.offer_shares}}"
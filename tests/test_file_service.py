@@ -4,3 +4,41 @@ from services.file_service import sha256_bytes
 def test_sha256_bytes_is_deterministic():
     sample = b"prospectus-automation"
     assert sha256_bytes(sample) == sha256_bytes(sample)
+
+
+def test_save_uploaded_file_streams_bytes_and_hash(tmp_path):
+    import io
+
+    from services.file_service import save_uploaded_file
+
+    payload = b"prospectus" * 300_000
+    uploaded = io.BytesIO(payload)
+    uploaded.name = "source.pdf"
+    uploaded.read(10)
+
+    target_path, digest = save_uploaded_file(uploaded, tmp_path / "uploads")
+
+    assert target_path == tmp_path / "uploads" / "source.pdf"
+    assert target_path.read_bytes() == payload
+    assert digest == sha256_bytes(payload)
+
+
+def test_link_or_copy_shares_bytes_and_tolerates_existing_destination(tmp_path):
+    from services.file_service import link_or_copy
+
+    source = tmp_path / "source.docx"
+    source.write_bytes(b"source-bytes")
+
+    target = link_or_copy(source, tmp_path / "templates" / "source_as_template.docx")
+    assert target.read_bytes() == b"source-bytes"
+    assert link_or_copy(source, target) == target
+
+
+def test_sha256_file_matches_in_memory_digest(tmp_path):
+    from services.file_service import sha256_file
+
+    payload = b"draft" * 500_000
+    target = tmp_path / "draft.docx"
+    target.write_bytes(payload)
+
+    assert sha256_file(target) == sha256_bytes(payload)
@@ -107,6 +107,9 @@ def test_generate_draft_docx_creates_file_and_db_rows(tmp_path, monkeypatch):
         assert "3,493,236,093" in generated_text
         assert "AED 1.30 – AED 1.50" in generated_text
         assert "Missing Information" in generated_text
+        missing_block = ["Missing Information", ""] + [f"- [[MISSING: {field}]]" for field in result["missing_fields"]]
+        assert [paragraph.text for paragraph in generated_doc.paragraphs[: len(missing_block)]] == missing_block
+        assert generated_doc.paragraphs[len(missing_block)].text.startswith("Issuer: ")
         assert "[[MISSING: issuer.country]]" in generated_text
         assert "key_dates" not in result["missing_fields"]
         assert sorted(result["template_placeholders"]) == [
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+from services import json_codec
+
+
+def test_dumps_round_trips_and_sorts_keys():
+    payload = {"offer": {"offer_shares": 3493236093, "currency": "AED"}, "issuer": {"name": "Acme – Holdings"}}
+
+    encoded = json_codec.dumps(payload, sort_keys=True)
+
+    assert json_codec.loads(encoded) == payload
+    assert list(json.loads(encoded)) == ["issuer", "offer"]
+    assert json_codec.dumps(payload, sort_keys=True) == encoded
+
+
+def test_stdlib_fallback_when_orjson_is_missing(monkeypatch):
+    monkeypatch.setattr(json_codec, "orjson", None)
+    payload = {"b": [1, 2], "a": None}
+
+    assert json_codec.dumps(payload, sort_keys=True) == '{"a":null,"b":[1,2]}'
+    assert json_codec.loads('{"a": 1}') == {"a": 1}
+
+
+def test_stdlib_fallback_matches_orjson_output(monkeypatch):
+    pytest.importorskip("orjson")
+    payload = {"offer": {"offer_shares": 3493236093, "price": 1.5, "listed": True}, "issuer": {"name": "Acme – Holdings"}}
+
+    encoded = {sort_keys: json_codec.dumps(payload, sort_keys=sort_keys) for sort_keys in (False, True)}
+    monkeypatch.setattr(json_codec, "orjson", None)
+
+    assert {sort_keys: json_codec.dumps(payload, sort_keys=sort_keys) for sort_keys in (False, True)} == encoded
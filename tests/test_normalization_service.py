@@ -42,3 +42,31 @@ def test_normalize_inputs_generates_rendered_map_and_aliases() -> None:
     assert rendered["offer.nominal_value_per_share"] == "AED 0.04"
     assert rendered["offer.percentage_offered"] == "15%"
     assert "offer.offer_shares_words" in missing
+
+
+def test_normalize_inputs_marks_invalid_values_missing_and_keeps_raw_input() -> None:
+    normalized, rendered, missing = normalize_inputs(
+        "talabat_v1",
+        {
+            "issuer": {"name": "  Talabat Holding plc  "},
+            "offer": {
+                "offer_shares": 0,
+                "price_range_low_aed": "1.50",
+                "price_range_high_aed": "1.30",
+                "nominal_value_per_share_aed": "abc",
+                "percentage_offered": "15.50",
+            },
+        },
+    )
+
+    assert rendered["issuer.name"] == "Talabat Holding plc"
+    assert rendered["offer.size"] == "[[MISSING: offer.offer_shares]]"
+    assert normalized["offer"]["price_range_low_aed"] == 1.5
+    assert normalized["offer"]["nominal_value_per_share_aed"] == "abc"
+    assert rendered["offer.percentage_offered"] == "15.5%"
+    assert missing == [
+        "offer.nominal_value_per_share",
+        "offer.offer_shares",
+        "offer.offer_shares_words",
+        "offer.price_range",
+    ]
@@ -1,5 +1,6 @@
 import importlib
 import json
+import re
 import sys
 
 import pytest
@@ -197,3 +198,97 @@ def test_extract_source_deal_values_returns_evidence_and_confidence(tmp_path):
         assert len(evidence_items) >= 1
         assert evidence_items[0]["snippet"]
         assert evidence_items[0]["confidence"] > 0
+
+
+def test_parameterize_dry_run_with_preparsed_document_matches_path_parse(tmp_path, monkeypatch):
+    db_file = tmp_path / "parameterization_preparsed.db"
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db_file}")
+
+    session_module = importlib.import_module("db.session")
+    importlib.reload(session_module)
+
+    session_module.Base.metadata.clear()
+    sys.modules.pop("models", None)
+    sys.modules.pop("models.entities", None)
+    importlib.import_module("models.entities")
+
+    parameterization_service = importlib.import_module("services.parameterization_service")
+    importlib.reload(parameterization_service)
+    session_module.Base.metadata.create_all(bind=session_module.engine)
+
+    source_path = make_talabat_like_docx(tmp_path / "source_preparsed.docx")
+    kwargs = {
+        "source_docx_path": str(source_path),
+        "inputs": {"issuer": {"name": "Talabat Holding plc"}, "offer": {"offer_shares": 3493236093}},
+        "base_template_id": 1,
+        "source_document_id": 1,
+        "project_id": 1,
+        "dry_run": True,
+    }
+
+    from_path = parameterization_service.parameterize_template_from_source(**kwargs)
+    from_document = parameterization_service.parameterize_template_from_source(
+        **kwargs, document=DocxDocument(str(source_path))
+    )
+
+    assert from_document["parameterization_report"] == from_path["parameterization_report"]
+    assert from_document["analysis"]["counts"] == from_path["analysis"]["counts"]
+    assert from_document["source_extraction"] == from_path["source_extraction"]
+
+
+def test_replace_match_in_runs_rewrites_split_runs_in_one_pass():
+    parameterization_service = importlib.import_module("services.parameterization_service")
+    importlib.reload(parameterization_service)
+
+    paragraph = DocxDocument().add_paragraph()
+    for text in ["Range AED 1.", "30 or AED 1.30", "", " and issuer ", "plus issuer"]:
+        paragraph.add_run(text)
+
+    price_count = parameterization_service._replace_match_in_runs(
+        paragraph, re.compile(r"\bAED\s*1\.30\b"), "{{offer.price_range_low}}"
+    )
+    # A placeholder that matches its own pattern must not be matched again.
+    issuer_count = parameterization_service._replace_match_in_runs(paragraph, re.compile(r"\bissuer\b"), "{{issuer}}")
+
+    assert price_count == 2
+    assert issuer_count == 2
+    assert [run.text for run in paragraph.runs] == [
+        "Range {{offer.price_range_low}}",
+        " or {{offer.price_range_low}}",
+        "",
+        " and {{issuer}} ",
+        "plus {{issuer}}",
+    ]
+
+
+def test_is_allowed_location_matches_block_and_descendants_only():
+    parameterization_service = importlib.import_module("services.parameterization_service")
+    importlib.reload(parameterization_service)
+
+    allowed_paths = {"document/paragraphs/3", "document/tables/1/rows/0/cells/2"}
+
+    assert parameterization_service._is_allowed_location("document/paragraphs/3", allowed_paths)
+    assert parameterization_service._is_allowed_location("document/tables/1/rows/0/cells/2/paragraphs/0", allowed_paths)
+    assert not parameterization_service._is_allowed_location("document/paragraphs/30", allowed_paths)
+    assert not parameterization_service._is_allowed_location("document/tables/1/rows/0/cells/20", allowed_paths)
+    assert not parameterization_service._is_allowed_location("document", allowed_paths)
+
+
+def test_apply_rules_reads_fresh_text_for_repeated_merged_cell_paragraphs():
+    parameterization_service = importlib.import_module("services.parameterization_service")
+    importlib.reload(parameterization_service)
+
+    document = DocxDocument()
+    table = document.add_table(rows=1, cols=2)
+    merged = table.cell(0, 0).merge(table.cell(0, 1))
+    merged.paragraphs[0].text = "Issuer: Talabat Holding plc"
+
+    paragraphs = parameterization_service._collect_paragraphs(document)
+    rules = parameterization_service._build_rules(paragraphs, {"issuer": {"name": "Talabat Holding plc"}})
+    (report,) = parameterization_service._apply_rules(paragraphs, rules, set())
+
+    # row.cells yields the merged cell once per grid column, so its paragraph is visited twice.
+    assert [location for location, *_ in paragraphs].count("document/tables/0/rows/0/cells/1") == 1
+    assert report["found_count"] == 1
+    assert report["replaced_count"] == 1
+    assert merged.paragraphs[0].text == "Issuer: {{issuer.name}}"
@@ -6,7 +6,11 @@ from pathlib import Path
 
 from docx import Document as DocxDocument
 
-from services.placeholder_service import extract_placeholders_from_docx, replace_placeholders_in_docx
+from services.placeholder_service import (
+    extract_placeholders_from_docx,
+    extract_placeholders_from_docx_path,
+    replace_placeholders_in_docx,
+)
 
 
 def test_replace_placeholders_in_paragraphs_and_tables(tmp_path):
@@ -36,6 +40,27 @@ def test_replace_placeholders_in_paragraphs_and_tables(tmp_path):
     assert missing_fields == ["issuer.country", "offer.size"]
 
 
+def test_replace_placeholders_keeps_run_boundaries_and_ignores_placeholder_like_values():
+    document = DocxDocument()
+    paragraph = document.add_paragraph()
+    for text in ["{{ issuer.", "name }} and {{iss", "uer.name}}", " of {{offer", ".size}}!"]:
+        paragraph.add_run(text)
+
+    missing_fields = replace_placeholders_in_docx(
+        document,
+        {"issuer": {"name": "{{issuer.name}}"}, "offer": {"size": "  "}},
+    )
+
+    # Values are inserted once; a value that looks like a placeholder is not expanded again.
+    assert [run.text for run in paragraph.runs] == [
+        "{{issuer.name}}",
+        " and {{issuer.name}}",
+        "",
+        " of [[MISSING: offer.size]]",
+        "!",
+    ]
+    assert missing_fields == ["offer.size"]
+
 
 def test_extract_placeholders_from_docx_reads_paragraphs_and_tables(tmp_path):
     fixture_path = Path(tmp_path) / "extract_fixture.docx"
@@ -50,3 +75,56 @@ def test_extract_placeholders_from_docx_reads_paragraphs_and_tables(tmp_path):
     placeholders = extract_placeholders_from_docx(loaded)
 
     assert placeholders == ["issuer.name", "offer.offer_shares"]
+
+
+def test_extract_placeholders_from_docx_path_matches_document_scan(tmp_path):
+    fixture_path = Path(tmp_path) / "zip_scan_fixture.docx"
+
+    document = DocxDocument()
+    paragraph = document.add_paragraph()
+    paragraph.add_run("Issuer: {{ issuer")
+    paragraph.add_run(".name }} & {{offer.size}}")
+    document.add_paragraph("<{{offer.price_range}}> {{not a placeholder}}")
+    table = document.add_table(rows=1, cols=2)
+    table.rows[0].cells[1].text = "Offer size: {{offer.offer_shares}}"
+    document.sections[0].header.paragraphs[0].text = "{{header.only}}"
+    document.save(str(fixture_path))
+
+    placeholders = extract_placeholders_from_docx_path(fixture_path)
+
+    assert placeholders == extract_placeholders_from_docx(DocxDocument(str(fixture_path)))
+    assert placeholders == ["issuer.name", "offer.offer_shares", "offer.price_range", "offer.size"]
+
+
+def test_extract_placeholders_from_docx_path_skips_parts_replacement_cannot_reach(tmp_path):
+    from docx.oxml import parse_xml
+    from docx.oxml.ns import nsdecls
+
+    fixture_path = Path(tmp_path) / "unreachable_fixture.docx"
+
+    document = DocxDocument()
+    document.add_paragraph("Issuer: {{issuer.name}}")
+    # A block content control wrapping a paragraph, and a run-level one inside a body paragraph.
+    document.element.body.append(
+        parse_xml(
+            f"<w:sdt {nsdecls('w')}><w:sdtContent><w:p><w:r><w:t>{{{{offer.offer_shares}}}}</w:t></w:r></w:p>"
+            "</w:sdtContent></w:sdt>"
+        )
+    )
+    paragraph = document.add_paragraph("Range: ")
+    paragraph._p.append(
+        parse_xml(
+            f"<w:sdt {nsdecls('w')}><w:sdtContent><w:r><w:t>{{{{offer.price_range}}}}</w:t></w:r>"
+            "</w:sdtContent></w:sdt>"
+        )
+    )
+    broken = document.add_paragraph()
+    broken.add_run("{{offer.")
+    broken.runs[0].add_break()
+    broken.add_run("size}}")
+    document.save(str(fixture_path))
+
+    placeholders = extract_placeholders_from_docx_path(fixture_path)
+
+    assert placeholders == extract_placeholders_from_docx(DocxDocument(str(fixture_path)))
+    assert placeholders == ["issuer.name"]
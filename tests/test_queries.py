@@ -0,0 +1,156 @@
+import importlib
+import sys
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("streamlit")
+
+
+def _init_test_modules(monkeypatch, db_file):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db_file}")
+
+    session_module = importlib.import_module("db.session")
+    importlib.reload(session_module)
+
+    session_module.Base.metadata.clear()
+    for module_name in ["models", "models.entities", "services.queries"]:
+        sys.modules.pop(module_name, None)
+
+    models_module = importlib.import_module("models.entities")
+    queries = importlib.import_module("services.queries")
+    queries.list_projects.clear()
+    queries.list_documents.clear()
+    queries.list_templates.clear()
+    queries.list_templates_page.clear()
+    queries.documents_table.clear()
+    queries.templates_table.clear()
+
+    session_module.Base.metadata.create_all(bind=session_module.engine)
+    return session_module, models_module, queries
+
+
+def test_list_documents_returns_plain_rows_and_clear_refreshes(tmp_path, monkeypatch):
+    session_module, models_module, queries = _init_test_modules(monkeypatch, tmp_path / "test_queries.db")
+
+    session = session_module.SessionLocal()
+    try:
+        project = models_module.ProspectusProject(name="Query Project")
+        session.add(project)
+        session.commit()
+        project_id = project.id
+
+        assert queries.list_documents(project_id) == []
+
+        session.add(
+            models_module.Document(
+                project_id=project_id,
+                doc_type="docx",
+                file_name="source.docx",
+                file_path=f"storage/projects/{project_id}/source.docx",
+                sha256="a" * 64,
+                version=1,
+            )
+        )
+        session.commit()
+
+        assert queries.list_documents(project_id) == []
+        queries.list_documents.clear()
+
+        documents = queries.list_documents(project_id)
+        assert len(documents) == 1
+        assert documents[0]["file_name"] == "source.docx"
+        assert documents[0]["doc_type"] == "docx"
+        assert [p["name"] for p in queries.list_projects()] == ["Query Project"]
+    finally:
+        session.close()
+
+
+def test_documents_table_uses_display_columns_and_invalidates(tmp_path, monkeypatch):
+    session_module, models_module, queries = _init_test_modules(monkeypatch, tmp_path / "test_tables.db")
+
+    session = session_module.SessionLocal()
+    try:
+        project = models_module.ProspectusProject(name="Table Project")
+        session.add(project)
+        session.commit()
+        project_id = project.id
+
+        empty = queries.documents_table(project_id)
+        assert list(empty.columns) == ["ID", "Type", "Version", "File", "SHA256", "Locked", "Created At"]
+        assert empty.empty
+
+        session.add(
+            models_module.Document(
+                project_id=project_id,
+                doc_type="pdf",
+                file_name="source.pdf",
+                file_path=f"storage/projects/{project_id}/source.pdf",
+                sha256="b" * 64,
+                version=1,
+            )
+        )
+        session.commit()
+        queries.invalidate_documents()
+
+        table = queries.documents_table(project_id)
+        assert table["File"].tolist() == ["source.pdf"]
+        assert table["Locked"].tolist() == [False]
+    finally:
+        session.close()
+
+
+def test_list_templates_page_walks_keyset_newest_first(tmp_path, monkeypatch):
+    session_module, models_module, queries = _init_test_modules(monkeypatch, tmp_path / "test_pages.db")
+
+    session = session_module.SessionLocal()
+    try:
+        for index in range(5):
+            session.add(
+                models_module.Template(
+                    name=f"Template {index}",
+                    sha256=f"{index}" * 64,
+                    file_path=f"storage/templates/t{index}.docx",
+                )
+            )
+        session.commit()
+    finally:
+        session.close()
+
+    first_page, first_has_older = queries.list_templates_page(None, 2)
+    second_page, second_has_older = queries.list_templates_page(first_page[-1]["id"], 2)
+    last_page, last_has_older = queries.list_templates_page(second_page[-1]["id"], 2)
+
+    assert [t["name"] for t in first_page] == ["Template 4", "Template 3"]
+    assert [t["name"] for t in second_page] == ["Template 2", "Template 1"]
+    assert [t["name"] for t in last_page] == ["Template 0"]
+    assert (first_has_older, second_has_older, last_has_older) == (True, True, False)
+
+
+@pytest.mark.parametrize("template_count", [25, 50])
+def test_list_templates_page_has_no_older_page_after_exact_multiple(tmp_path, monkeypatch, template_count):
+    session_module, models_module, queries = _init_test_modules(monkeypatch, tmp_path / "test_exact_pages.db")
+
+    session = session_module.SessionLocal()
+    try:
+        session.add_all(
+            models_module.Template(
+                name=f"Template {index}",
+                sha256=f"{index:064d}",
+                file_path=f"storage/templates/t{index}.docx",
+            )
+            for index in range(template_count)
+        )
+        session.commit()
+    finally:
+        session.close()
+
+    pages = []
+    before_id, has_older = None, True
+    while has_older:
+        page, has_older = queries.list_templates_page(before_id)
+        pages.append(page)
+        before_id = page[-1]["id"]
+
+    assert [len(page) for page in pages] == [queries.TEMPLATE_PAGE_SIZE] * (template_count // queries.TEMPLATE_PAGE_SIZE)
+    assert sum(len(page) for page in pages) == template_count